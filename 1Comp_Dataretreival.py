@@ -6,7 +6,9 @@ Created on Wed Oct 30 16:10:44 2024
 """
 
 import yfinance as yf
-import pandas as pd
+
+from indicators import compute_indicators
+from ingestion import ingest
 
 def fetch_stock_data(ticker, period='1y', interval='1d'):
     """
@@ -21,29 +23,6 @@ def fetch_stock_data(ticker, period='1y', interval='1d'):
     data = stock.history(period=period, interval=interval)
     return data
 
-def calculate_moving_averages(data, short_window=50, long_window=200):
-    """
-    Calculate 50-day and 200-day moving averages for the stock data.
-    
-    :param data: DataFrame - Stock price data
-    :param short_window: int - Short window for moving average (default 50)
-    :param long_window: int - Long window for moving average (default 200)
-    :return: DataFrame - Original data with added moving averages
-    """
-    data['MA50'] = data['Close'].rolling(window=short_window).mean()
-    data['MA200'] = data['Close'].rolling(window=long_window).mean()
-    return data
-
-def calculate_price_change(data):
-    """
-    Calculate the percentage change in stock price over time.
-    
-    :param data: DataFrame - Stock price data
-    :return: DataFrame - Data with added price change percentage
-    """
-    data['Price Change (%)'] = data['Close'].pct_change() * 100
-    return data
-
 def calculate_volatility(data):
     """
     Calculate stock price volatility based on the percentage change in stock price.
@@ -53,22 +32,6 @@ def calculate_volatility(data):
     """
     return data['Price Change (%)'].std()
 
-def calculate_rsi(data, period=14):
-    """
-    Calculate the Relative Strength Index (RSI) for the stock data.
-    
-    :param data: DataFrame - Stock price data
-    :param period: int - The number of days to calculate RSI (default: 14 days)
-    :return: DataFrame - Data with added RSI column
-    """
-    delta = data['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    data['RSI'] = rsi
-    return data
-
 def process_stock_data(ticker):
     """
     Fetch stock data and calculate key metrics (moving averages, price change, RSI, volatility).
@@ -76,17 +39,12 @@ def process_stock_data(ticker):
     :param ticker: str - Stock ticker symbol
     :return: DataFrame - Stock data with calculated metrics
     """
-    # Step 1: Fetch stock data
-    stock_data = fetch_stock_data(ticker)
-    
-    # Step 2: Calculate 50-day and 200-day moving averages
-    stock_data = calculate_moving_averages(stock_data)
-    
-    # Step 3: Calculate price change percentage
-    stock_data = calculate_price_change(stock_data)
+    # Step 1: Fetch stock data, filling missing sessions and removing bad prices
+    stock_data = ingest(ticker, fetch_stock_data(ticker))
     
-    # Step 4: Calculate RSI (Relative Strength Index)
-    stock_data = calculate_rsi(stock_data)
+    # Steps 2-4: 50-day and 200-day moving averages, price change percentage and RSI,
+    # sharing intermediates such as the closing price differences
+    stock_data = compute_indicators(stock_data, ['MA50', 'MA200', 'Price Change (%)', 'RSI'])
     
     # Step 5: Calculate volatility (standard deviation of price change)
     volatility = calculate_volatility(stock_data)
@@ -105,37 +63,25 @@ if __name__ == "__main__":
     print(stock_data[['Open', 'Close', 'MA50', 'MA200', 'Price Change (%)', 'RSI']].tail())
 
 import yfinance as yf
-import pandas as pd
 import dash
 from dash import dcc, html
 import plotly.graph_objs as go
 from dash.dependencies import Input, Output
 
+from indicators import compute_indicators
+from ingestion import ingest
+from response_caching import enable_compression
+from trace_encoding import DATE_AXIS, line_trace
+
 # Fetch stock data
 def fetch_stock_data(ticker, period='1y', interval='1d'):
     stock = yf.Ticker(ticker)
     data = stock.history(period=period, interval=interval)
-    data['Price Change (%)'] = data['Close'].pct_change() * 100
-    return data
-
-# Calculate RSI
-def calculate_rsi(data, period=14):
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    data['RSI'] = rsi
-    return data
-
-# Moving averages
-def calculate_moving_averages(data, short_window=50, long_window=200):
-    data['MA50'] = data['Close'].rolling(window=short_window).mean()
-    data['MA200'] = data['Close'].rolling(window=long_window).mean()
     return data
 
 # Dashboard App Layout
 app = dash.Dash(__name__)
+enable_compression(app.server)
 
 app.layout = html.Div(style={'backgroundColor': '#003B73', 'padding': '20px'}, children=[
     html.H1('Stock Performance Dashboard', style={'textAlign': 'center', 'color': '#F0F8FF'}),
@@ -168,30 +114,29 @@ app.layout = html.Div(style={'backgroundColor': '#003B73', 'padding': '20px'}, c
     [Input('stock-dropdown', 'value')]
 )
 def update_graphs(selected_ticker):
-    df = fetch_stock_data(selected_ticker)
-    df = calculate_rsi(df)
-    df = calculate_moving_averages(df)
+    df = ingest(selected_ticker, fetch_stock_data(selected_ticker))
+    df = compute_indicators(df, ['MA50', 'MA200', 'RSI', 'Price Change (%)'])
 
     # Stock Price Graph
-    stock_trace = go.Scatter(
-        x=df.index,
-        y=df['Close'],
+    stock_trace = line_trace(
+        df.index,
+        df['Close'],
         mode='lines',
         name=f'{selected_ticker} Close Price',
         line=dict(color='#48A9A6')
     )
 
-    ma50_trace = go.Scatter(
-        x=df.index,
-        y=df['MA50'],
+    ma50_trace = line_trace(
+        df.index,
+        df['MA50'],
         mode='lines',
         name='50-day MA',
         line=dict(color='#96C5F7')
     )
 
-    ma200_trace = go.Scatter(
-        x=df.index,
-        y=df['MA200'],
+    ma200_trace = line_trace(
+        df.index,
+        df['MA200'],
         mode='lines',
         name='200-day MA',
         line=dict(color='#1B4F72')
@@ -200,7 +145,7 @@ def update_graphs(selected_ticker):
     stock_fig = go.Figure([stock_trace, ma50_trace, ma200_trace])
     stock_fig.update_layout(
         title=f'{selected_ticker} Stock Performance',
-        xaxis_title='Date',
+        xaxis=DATE_AXIS,
         yaxis_title='Price',
         plot_bgcolor='#011F4B',
         paper_bgcolor='#011F4B',
@@ -208,9 +153,10 @@ def update_graphs(selected_ticker):
     )
 
     # RSI Graph
-    rsi_trace = go.Scatter(
-        x=df.index,
-        y=df['RSI'],
+    rsi_trace = line_trace(
+        df.index,
+        df['RSI'],
+        dtype='f4',
         mode='lines',
         name='RSI',
         line=dict(color='#1B98E0')
@@ -219,7 +165,7 @@ def update_graphs(selected_ticker):
     rsi_fig = go.Figure([rsi_trace])
     rsi_fig.update_layout(
         title=f'{selected_ticker} RSI (Relative Strength Index)',
-        xaxis_title='Date',
+        xaxis=DATE_AXIS,
         yaxis_title='RSI',
         plot_bgcolor='#03396C',
         paper_bgcolor='#03396C',
@@ -250,13 +196,17 @@ if __name__ == '__main__':
 import dash
 from dash import dcc, html
 import plotly.graph_objs as go
-import pandas as pd
 
-# Sample Data (Replace this with your fetched data)
-df = pd.read_csv("path_to_your_data.csv")  # Replace with actual file path or dataframe
+from price_mmap import PriceArray
+from response_caching import enable_compression
+
+# Sample Data, memory-mapped read-only so every worker shares one copy
+# (convert the CSV once with: python price_mmap.py path_to_your_data.csv path_to_your_data.prices)
+prices = PriceArray("path_to_your_data.prices")  # Replace with actual file path
 
 # Initialize Dash app
 app = dash.Dash(__name__)
+enable_compression(app.server)
 
 # Define the layout of the dashboard
 app.layout = html.Div(
@@ -293,12 +243,13 @@ app.layout = html.Div(
     [dash.dependencies.Input('stock-dropdown', 'value')]
 )
 def update_graph(selected_stock):
-    # Filter data for the selected stock
-    filtered_df = df[df['Stock'] == selected_stock]
+    # Pick up a replaced price file, then slice out the selected stock
+    prices.refresh()
+    filtered_df = prices.frame(selected_stock, fields=['Close', 'RSI'])
 
     # Create traces for Close Price and RSI
     trace_close = go.Scatter(
-        x=filtered_df['Date'],
+        x=filtered_df.index,
         y=filtered_df['Close'],
         mode='lines',
         name='Closing Price',
@@ -306,7 +257,7 @@ def update_graph(selected_stock):
     )
 
     trace_rsi = go.Scatter(
-        x=filtered_df['Date'],
+        x=filtered_df.index,
         y=filtered_df['RSI'],
         mode='lines',
         name='RSI (Relative Strength Index)',
@@ -5,17 +5,30 @@ Created on Wed Oct 30 21:13:24 2024
 @author: Iaina
 """
 
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
 import pandas as pd
 import dash
-from dash import dcc, html
+from dash import dcc, html, Patch
+from flask import jsonify
 import plotly.graph_objs as go
 import plotly.express as px
-import numpy as np
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from indicators import update_indicators
+from ingestion import data_quality_report, ingest
+from portfolio import PortfolioModel, parse_holdings
+from response_caching import data_version, enable_compression
+from sentiment_data import sentiment_store
+from session_resources import ResourceManager, SessionStates
+from trace_encoding import DATE_AXIS, encode_values, line_trace
 
 # Initialize Dash app
 app = dash.Dash(__name__)
+enable_compression(app.server)
 
 # Dropdown options for selecting stocks
 stock_options = [
@@ -26,6 +39,43 @@ stock_options = [
     {'label': 'Amazon', 'value': 'AMZN'}
 ]
 
+stock_tickers = {option['value'] for option in stock_options}
+
+# Graphs filled from the browser-side figure cache
+DASHBOARD_GRAPHS = ['stock-graph', 'bubble-chart', 'sentiment-bar-chart',
+                    'volatility-graph', 'sentiment-index-graph', 'volatility-gauge']
+
+# Browser cache holds every listed company; entries are revalidated after 15 minutes
+FIGURE_CACHE_SIZE = len(stock_options)
+FIGURE_CACHE_MAX_AGE = 15 * 60
+
+# Indicators the charts draw, and the latest indicator frame per listed ticker
+CHART_INDICATORS = ['RSI', 'Volatility']
+indicator_frames = {}
+
+# Server-side data and figures shared by all sessions, capped at 512 MB in total
+resources = ResourceManager(budget_bytes=512 * 1024 * 1024)
+
+# Portfolio tab: largest accepted portfolio and starting holdings. Unlike the company
+# dropdown it takes any ticker; the fetched data counts against the resources budget,
+# and one pool shared by all sessions caps concurrent fetches of uncached tickers
+MAX_PORTFOLIO_POSITIONS = 500
+DEFAULT_HOLDINGS = "IBM 20\nORCL 30\nMSFT 10\nGOOGL 15\nAMZN 12"
+portfolio_fetch_pool = ThreadPoolExecutor(max_workers=8)
+
+# Each session's portfolio view, changed in place; a kept view also keeps its model alive,
+# so the number of sessions is capped and idle ones go when the model would expire
+portfolio_states = SessionStates(max_sessions=50, session_timeout=FIGURE_CACHE_MAX_AGE)
+
+# A portfolio model missing tickers whose fetch failed; returned but not cached, so they are retried
+class IncompletePortfolio(Exception):
+    def __init__(self, model):
+        super().__init__(model)
+        self.model = model
+
+# Generate sentiment for every listed company in one batch
+sentiment_store.prefetch([option['value'] for option in stock_options])
+
 # ======== Data Processing Functions ========
 
 # Fetch historical stock data
@@ -36,59 +86,48 @@ def fetch_stock_data(ticker, period='1y', interval='1d'):
     data = stock.history(period=period, interval=interval)
     return data
 
-# Calculate moving averages
-def calculate_moving_averages(data, short_window=50, long_window=200):
-    data['MA50'] = data['Close'].rolling(window=short_window).mean()
-    data['MA200'] = data['Close'].rolling(window=long_window).mean()
-    return data
-
-# Calculate percentage change in stock price
-def calculate_price_change(data):
-    data['Price Change (%)'] = data['Close'].pct_change() * 100
-    return data
+# Cleaned stock data from the shared server-side cache, refetched at most once per revalidation period
+def cached_stock_data(session_id, ticker):
+    return resources.get(session_id, ('stock', ticker), lambda: ingest(ticker, fetch_stock_data(ticker)),
+                         max_age=FIGURE_CACHE_MAX_AGE)
 
-# Calculate volatility as standard deviation of price changes over a rolling window
-def calculate_volatility(data, window=14):
-    data['Volatility'] = data['Price Change (%)'].rolling(window=window).std()
-    return data
+# Cached stock data of many tickers, fetching the missing ones in parallel;
+# a failed fetch gives None for that ticker instead of failing the whole portfolio
+def fetch_portfolio_histories(session_id, tickers):
+    def fetch(ticker):
+        try:
+            return cached_stock_data(session_id, ticker)
+        except Exception:
+            return None
+    return dict(zip(tickers, portfolio_fetch_pool.map(fetch, tickers)))
 
-# Calculate Relative Strength Index (RSI)
-def calculate_rsi(data, period=14):
-    delta = data['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
-    loss = -delta.where(delta < 0, 0).rolling(window=period).mean()
-    rs = gain / loss
-    data['RSI'] = 100 - (100 / (1 + rs))
-    return data
+# Portfolio model over the tickers' histories; raises IncompletePortfolio if any fetch failed
+def build_portfolio_model(session_id, tickers):
+    histories = fetch_portfolio_histories(session_id, tickers)
+    model = PortfolioModel(histories)
+    if any(history is None for history in histories.values()):
+        raise IncompletePortfolio(model)
+    return model
 
-# Generate sample sentiment data
+# Sample sentiment data, generated once per ticker and shared by every tab
 def fetch_sentiment_data(ticker):
-    sentiment_data = pd.DataFrame({
-        'Date': pd.date_range(start='2023-01-01', periods=30, freq='D'),
-        'Positive': np.random.randint(10, 40, size=30),
-        'Neutral': np.random.randint(20, 50, size=30),
-        'Negative': np.random.randint(5, 30, size=30),
-        'Volume': np.random.randint(100000, 1000000, size=30),
-        'Volatility': np.random.uniform(1, 3, size=30)
-    })
-    # Calculate sentiment index as a simple weighted score
-    sentiment_data['Sentiment Index'] = sentiment_data['Positive'] - sentiment_data['Negative']
-    return sentiment_data
+    return sentiment_store.get(ticker)
 
 # ======== Visualization Functions ========
 
 # Stock performance line and RSI graph
 def create_stock_graph(data, selected_stock):
-    trace_close = go.Scatter(
-        x=data.index,
-        y=data['Close'],
+    trace_close = line_trace(
+        data.index,
+        data['Close'],
         mode='lines',
         name='Closing Price',
         line=dict(color='#006064')
     )
-    trace_rsi = go.Scatter(
-        x=data.index,
-        y=data['RSI'],
+    trace_rsi = line_trace(
+        data.index,
+        data['RSI'],
+        dtype='f4',
         mode='lines',
         name='RSI',
         yaxis='y2',
@@ -96,7 +135,7 @@ def create_stock_graph(data, selected_stock):
     )
     layout = go.Layout(
         title=f'Stock Performance for {selected_stock}',
-        xaxis={'title': 'Date'},
+        xaxis=DATE_AXIS,
         yaxis={'title': 'Price (USD)'},
         yaxis2={'title': 'RSI', 'overlaying': 'y', 'side': 'right', 'range': [0, 100]},
         plot_bgcolor='#B3E5FC',
@@ -107,14 +146,14 @@ def create_stock_graph(data, selected_stock):
 
 # Volatility over time graph
 def create_volatility_graph(data):
-    fig = go.Figure(go.Scatter(
-        x=data.index, y=data['Volatility'],
+    fig = go.Figure(line_trace(
+        data.index, data['Volatility'], dtype='f4',
         mode='lines', name='Volatility',
         line=dict(color='#FFA500')
     ))
     fig.update_layout(
         title="Volatility Over Time",
-        xaxis_title="Date",
+        xaxis=DATE_AXIS,
         yaxis_title="Volatility",
         plot_bgcolor='#E0F7FA',
         paper_bgcolor='#E0F7FA',
@@ -180,9 +219,78 @@ def create_volatility_gauge(data):
     fig.update_layout(paper_bgcolor="#E0F7FA")
     return fig
 
+# Portfolio value over time for the current holdings
+def create_portfolio_equity_graph(model, view):
+    fig = go.Figure(line_trace(
+        model.dates, view.equity,
+        mode='lines', name='Portfolio Value',
+        line=dict(color='#006064')
+    ))
+    fig.update_layout(
+        title="Portfolio Value Over Time",
+        xaxis=DATE_AXIS,
+        yaxis_title="Value (USD)",
+        plot_bgcolor='#B3E5FC',
+        paper_bgcolor='#E0F7FA',
+        font=dict(color='#004D61'),
+        title_x=0.5  # Center title
+    )
+    return fig
+
+# Daily returns of the holdings at their current weights
+def create_portfolio_returns_graph(model, view):
+    fig = go.Figure(line_trace(
+        model.dates, 100 * view.weighted_returns(), dtype='f4',
+        mode='lines', name='Weighted Return',
+        line=dict(color='#42A5F5')
+    ))
+    fig.update_layout(
+        title="Weighted Daily Returns",
+        xaxis=DATE_AXIS,
+        yaxis_title="Return (%)",
+        plot_bgcolor='#E0F7FA',
+        paper_bgcolor='#E0F7FA',
+        font=dict(color='#004D61'),
+        title_x=0.5  # Center title
+    )
+    return fig
+
+# Weight and share of portfolio risk per position
+def create_contribution_chart(model, view):
+    contributions = view.contributions()
+    fig = go.Figure([
+        go.Bar(x=model.tickers, y=encode_values(100 * contributions['Weight'], 'f4'), name='Weight', marker_color='#1565C0'),
+        go.Bar(x=model.tickers, y=encode_values(100 * contributions['Risk Contribution'], 'f4'), name='Risk Contribution',
+               marker_color='#FFA500'),
+    ])
+    fig.update_layout(
+        title="Contributions per Position",
+        yaxis_title="Share of Portfolio (%)",
+        barmode='group',
+        plot_bgcolor='#E0F7FA',
+        paper_bgcolor='#E0F7FA',
+        font=dict(color='#004D61'),
+        title_x=0.5  # Center title
+    )
+    return fig
+
+# Headline numbers and any holdings that could not be used
+def create_portfolio_summary(view, problems):
+    summary = view.summary()
+    style = {'display': 'inline-block', 'margin': '0 25px', 'font-size': '18px'}
+    children = [
+        html.Span(f"Value: ${summary['value']:,.2f}", style=style),
+        html.Span(f"Period Return: {100 * summary['period_return']:.2f}%", style=style),
+        html.Span(f"Annualized Return: {100 * summary['annual_return']:.2f}%", style=style),
+        html.Span(f"Annualized Volatility: {100 * summary['volatility']:.2f}%", style=style),
+    ]
+    if problems:
+        children.append(html.Div(problems, style={'color': '#C62828', 'padding-top': '10px'}))
+    return children
+
 # ======== Dashboard Layout with Tabs ========
 
-app.layout = html.Div(
+dashboard_layout = html.Div(
     style={'background-color': '#E0F7FA', 'font-family': 'Arial, sans-serif'},
     children=[
         html.H1(
@@ -198,6 +306,10 @@ app.layout = html.Div(
                 style={'width': '250px', 'display': 'inline-block', 'font-size': '18px'}
             )
         ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'center', 'padding': '20px', 'background-color': '#BBDEFB'}),
+
+        # Browser-side cache of recently viewed tickers' figures
+        dcc.Store(id='figure-cache', storage_type='memory', data={}),
+        dcc.Store(id='figure-request', storage_type='memory'),
         
         # Tabs for organizing components
         dcc.Tabs([
@@ -217,54 +329,175 @@ app.layout = html.Div(
                     dcc.Graph(id='volatility-gauge', style={'display': 'inline-block', 'width': '48%', 'padding': '20px'}),
                 ], style={'textAlign': 'center', 'padding': '20px'})
             ], style={'font-weight': 'bold', 'font-size': '18px', 'color': '#ffffff', 'background-color': '#1565C0'}),
+            dcc.Tab(label='Portfolio', children=[
+                html.Div([
+                    html.Label("Holdings (one \"TICKER SHARES\" per line):", style={'font-weight': 'bold', 'font-size': '18px'}),
+                    dcc.Textarea(id='portfolio-holdings', value=DEFAULT_HOLDINGS,
+                                 style={'width': '300px', 'height': '150px', 'display': 'block', 'margin': '10px auto'}),
+                    html.Button('Update Portfolio', id='portfolio-update', style={'font-size': '16px'}),
+                    html.Div(id='portfolio-summary', style={'color': '#004D61', 'padding': '10px'}),
+                ], style={'textAlign': 'center', 'padding': '20px', 'background-color': '#BBDEFB'}),
+                # Token of the full portfolio figures last shown; patches only apply on top of those
+                dcc.Store(id='portfolio-shown', storage_type='memory'),
+                dcc.Graph(id='portfolio-equity-graph', style={'height': '500px'}),
+                dcc.Graph(id='portfolio-returns-graph', style={'height': '400px'}),
+                dcc.Graph(id='portfolio-contribution-graph', style={'height': '500px'}),
+            ], style={'font-weight': 'bold', 'font-size': '18px', 'color': '#ffffff', 'background-color': '#1565C0'}),
         ])
     ]
 )
 
+# New session id on every page load, so the server can tell viewers apart
+def serve_layout():
+    return html.Div([dcc.Store(id='session-id', data=uuid.uuid4().hex), dashboard_layout])
+
+app.layout = serve_layout
+
+# Current server-side cache use
+@app.server.route('/_resource-usage')
+def resource_usage():
+    return jsonify(resources.usage())
+
+# Data-quality stats of the latest fetch of each ticker
+@app.server.route('/_data-quality')
+def data_quality():
+    return jsonify(data_quality_report())
+
 # ======== Callbacks ========
 
-# Update stock graph based on dropdown selection
-@app.callback(Output('stock-graph', 'figure'), [Input('stock-dropdown', 'value')])
-def update_stock_graph(selected_stock):
-    data = fetch_stock_data(selected_stock)
-    if data.empty:
-        return go.Figure()
-    data = calculate_moving_averages(data)
-    data = calculate_price_change(data)
-    data = calculate_rsi(data)
-    return create_stock_graph(data, selected_stock)
-
-# Update sentiment charts based on dropdown selection
+# Build every figure for one ticker from a single stock data fetch
+def build_ticker_figures(selected_stock, data, sentiment):
+    figures = {'stock-graph': go.Figure(), 'volatility-graph': go.Figure()}
+    if not data.empty:
+        # Only the indicators the charts draw; after a refetch only rows whose
+        # windows saw corrected or new data are recomputed
+        data = update_indicators(indicator_frames.get(selected_stock), data, CHART_INDICATORS)
+        indicator_frames[selected_stock] = data
+        figures['stock-graph'] = create_stock_graph(data, selected_stock)
+        figures['volatility-graph'] = create_volatility_graph(data)
+    figures['bubble-chart'] = create_bubble_chart(sentiment)
+    figures['sentiment-bar-chart'] = create_sentiment_bar_chart(sentiment)
+    figures['sentiment-index-graph'] = create_sentiment_index_graph(sentiment)
+    figures['volatility-gauge'] = create_volatility_gauge(sentiment)
+    return figures
+
+# Ask the server for a ticker's figures unless the browser cache holds a fresh copy
+app.clientside_callback(
+    """
+    function(ticker, cache) {
+        cache = cache || {};
+        var entry = cache[ticker];
+        var now = Date.now();
+        if (!ticker || (entry && now - entry.checked < %d)) {
+            return window.dash_clientside.no_update;
+        }
+        var cached = Object.keys(cache).sort(function(a, b) { return cache[a].checked - cache[b].checked; });
+        return {ticker: ticker, version: entry ? entry.version : null, requested: now, cached: cached};
+    }
+    """ % (FIGURE_CACHE_MAX_AGE * 1000),
+    Output('figure-request', 'data'),
+    [Input('stock-dropdown', 'value')],
+    [State('figure-cache', 'data')]
+)
+
+# Fill the browser cache; figures are only resent when the data version changed
 @app.callback(
-    [Output('bubble-chart', 'figure'), Output('sentiment-bar-chart', 'figure')],
-    [Input('stock-dropdown', 'value')]
+    Output('figure-cache', 'data'),
+    [Input('figure-request', 'data')],
+    [State('session-id', 'data')]
+)
+def update_figure_cache(figure_request, session_id):
+    # Only listed companies, so clients cannot grow the server caches with arbitrary tickers
+    if figure_request is None or figure_request['ticker'] not in stock_tickers:
+        raise PreventUpdate
+    ticker = figure_request['ticker']
+    # Stock data is refetched at most once per revalidation period, whichever session asks
+    data = cached_stock_data(session_id, ticker)
+    sentiment = fetch_sentiment_data(ticker)
+    version = data_version(data, sentiment)
+    cache = Patch()
+    if version == figure_request['version']:
+        # Cached figures are still current, only mark them as checked
+        cache[ticker]['checked'] = figure_request['requested']
+        return cache
+    cache[ticker] = {
+        'version': version,
+        'checked': figure_request['requested'],
+        'figures': resources.get(session_id, ('figures', ticker, version),
+                                 lambda: build_ticker_figures(ticker, data.copy(), sentiment))
+    }
+    # Drop the least recently fetched tickers beyond the cache size
+    others = [t for t in figure_request['cached'] if t != ticker]
+    for old_ticker in others[:max(0, len(others) + 1 - FIGURE_CACHE_SIZE)]:
+        del cache[old_ticker]
+    return cache
+
+# Show the selected ticker's figures straight from the browser cache
+app.clientside_callback(
+    """
+    function(ticker, cache) {
+        var graphs = %s;
+        var entry = ticker && cache ? cache[ticker] : null;
+        if (ticker && !entry) {
+            return graphs.map(function() { return window.dash_clientside.no_update; });
+        }
+        return graphs.map(function(id) { return entry ? entry.figures[id] : {}; });
+    }
+    """ % json.dumps(DASHBOARD_GRAPHS),
+    [Output(graph_id, 'figure') for graph_id in DASHBOARD_GRAPHS],
+    [Input('stock-dropdown', 'value'), Input('figure-cache', 'data')]
 )
-def update_sentiment_graphs(selected_stock):
-    data = fetch_sentiment_data(selected_stock)
-    bubble_chart = create_bubble_chart(data)
-    sentiment_bar_chart = create_sentiment_bar_chart(data)
-    return bubble_chart, sentiment_bar_chart
-
-# Update volatility graph based on dropdown selection
-@app.callback(Output('volatility-graph', 'figure'), [Input('stock-dropdown', 'value')])
-def update_volatility_graph(selected_stock):
-    data = fetch_stock_data(selected_stock)
-    if data.empty:
-        return go.Figure()
-    data = calculate_price_change(data)
-    data = calculate_volatility(data)
-    return create_volatility_graph(data)
-
-# Update investor sentiment index graph and volatility gauge based on dropdown selection
+
+# Portfolio aggregates; changed holdings of the same tickers only patch the figures' values
 @app.callback(
-    [Output('sentiment-index-graph', 'figure'), Output('volatility-gauge', 'figure')],
-    [Input('stock-dropdown', 'value')]
+    [Output('portfolio-summary', 'children'),
+     Output('portfolio-equity-graph', 'figure'),
+     Output('portfolio-returns-graph', 'figure'),
+     Output('portfolio-contribution-graph', 'figure'),
+     Output('portfolio-shown', 'data')],
+    [Input('portfolio-update', 'n_clicks')],
+    [State('portfolio-holdings', 'value'), State('portfolio-shown', 'data'), State('session-id', 'data')]
 )
-def update_investor_insights(selected_stock):
-    data = fetch_sentiment_data(selected_stock)
-    sentiment_index_graph = create_sentiment_index_graph(data)
-    volatility_gauge = create_volatility_gauge(data)
-    return sentiment_index_graph, volatility_gauge
+def update_portfolio(n_clicks, holdings_text, shown, session_id):
+    holdings, errors = parse_holdings(holdings_text, max_positions=MAX_PORTFOLIO_POSITIONS)
+    problems = [f"Could not read: {', '.join(errors)}"] if errors else []
+    if not holdings:
+        return problems or "Enter holdings to see the portfolio.", go.Figure(), go.Figure(), go.Figure(), None
+    tickers = tuple(sorted(holdings))
+    # The aligned returns and covariance are built once per ticker set and shared by every session
+    try:
+        model = resources.get(session_id, ('portfolio', tickers), lambda: build_portfolio_model(session_id, tickers),
+                              max_age=FIGURE_CACHE_MAX_AGE, size_of=lambda model: model.nbytes)
+    except IncompletePortfolio as incomplete:
+        model = incomplete.model
+    missing = [ticker for ticker in tickers if ticker not in model.positions]
+    if missing:
+        problems.append(f"No data for: {', '.join(missing)}")
+    if not model.tickers:
+        return problems, go.Figure(), go.Figure(), go.Figure(), None
+
+    state = portfolio_states.get(session_id)
+    with state['lock']:
+        view = state.get('view')
+        # Patch only on top of the full figures the browser shows, for the same model
+        if view is None or view.model is not model or shown is None or shown != state.get('token'):
+            state['view'] = view = model.view(holdings)
+            state['token'] = uuid.uuid4().hex
+            return (create_portfolio_summary(view, problems), create_portfolio_equity_graph(model, view),
+                    create_portfolio_returns_graph(model, view), create_contribution_chart(model, view),
+                    state['token'])
+        return update_portfolio_figures(view, holdings, problems)
+
+# Update a view in place and send only the figures' new values
+def update_portfolio_figures(view, holdings, problems):
+    view.update(holdings)
+    contributions = view.contributions()
+    equity, returns, contribution = Patch(), Patch(), Patch()
+    equity['data'][0]['y'] = encode_values(view.equity)
+    returns['data'][0]['y'] = encode_values(100 * view.weighted_returns(), 'f4')
+    contribution['data'][0]['y'] = encode_values(100 * contributions['Weight'], 'f4')
+    contribution['data'][1]['y'] = encode_values(100 * contributions['Risk Contribution'], 'f4')
+    return create_portfolio_summary(view, problems), equity, returns, contribution, dash.no_update
 
 # ======== Run the App ========
 if __name__ == '__main__':
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized backtests of the dashboard's MA-crossover and RSI indicators.
+
+Prices are held as one (days x tickers) matrix. Cumulative sums of prices,
+gains and losses are computed once per matrix, after which any rolling mean
+(MA50/MA200 style or the RSI averages used by calculate_rsi) is a single
+subtraction, so sweeping many window parameters costs almost nothing extra.
+"""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from price_mmap import PriceArray
+
+TRADING_DAYS = 252
+
+STRATEGIES = ('ma_crossover', 'rsi_reversion')
+
+# ======== Shared Precomputation ========
+
+def to_price_matrix(frames, column='Close'):
+    """
+    Align fetch_stock_data outputs into one price matrix.
+
+    :param frames: dict - Ticker mapped to a DataFrame from fetch_stock_data
+    :param column: str - Price column to use
+    :return: DataFrame - Dates x tickers, gaps forward-filled
+    """
+    prices = pd.DataFrame({ticker: frame[column] for ticker, frame in frames.items()})
+    return prices.sort_index().ffill()
+
+def _cumsum0(values):
+    """Cumulative sum along time with a leading row of zeros."""
+    out = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+def precompute(closes):
+    """
+    Cumulative sums shared by every indicator window.
+
+    Missing prices (e.g. before a listing) count as zero in the sums and are
+    tracked separately, so a window is only valid once it is fully observed.
+
+    :param closes: array-like - Closing prices, shape (days, tickers)
+    :return: dict - Arrays used by the indicator and backtest functions
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+    valid = ~np.isnan(closes)
+    filled = np.where(valid, closes, 0.0)
+
+    # Like Close.diff() in calculate_rsi, the first change of a series counts as 0
+    both_valid = np.zeros_like(valid)
+    both_valid[1:] = valid[1:] & valid[:-1]
+    delta = np.zeros_like(closes)
+    delta[1:] = np.where(both_valid[1:], closes[1:] - closes[:-1], 0.0)
+
+    returns = np.zeros_like(closes)
+    returns[1:] = np.where(both_valid[1:], delta[1:] / np.where(both_valid[1:], closes[:-1], 1.0), 0.0)
+
+    return {
+        'closes': closes,
+        'returns': returns,
+        'close_csum': _cumsum0(filled),
+        'valid_csum': _cumsum0(valid.astype(np.float64)),
+        'gain_csum': _cumsum0(np.maximum(delta, 0.0)),
+        'loss_csum': _cumsum0(np.maximum(-delta, 0.0)),
+    }
+
+def _window_sum(csum, window):
+    """
+    Rolling sums from a cumulative sum; rows before the first full window are NaN.
+
+    :param csum: ndarray - Cumulative sum with leading zero row, shape (days + 1, tickers)
+    :param window: int - Window length in rows
+    :return: ndarray - Rolling sums, shape (days, tickers)
+    """
+    out = np.full((csum.shape[0] - 1, csum.shape[1]), np.nan)
+    out[window - 1:] = csum[window:] - csum[:-window]
+    return out
+
+def rolling_mean(pre, window):
+    """
+    Rolling mean of closing prices, equal to Close.rolling(window).mean().
+
+    :param pre: dict - Output of precompute
+    :param window: int - Window length in days
+    :return: ndarray - Moving average, shape (days, tickers)
+    """
+    counts = _window_sum(pre['valid_csum'], window)
+    means = _window_sum(pre['close_csum'], window) / window
+    return np.where(counts == window, means, np.nan)
+
+def rsi(pre, period=14):
+    """
+    Relative Strength Index with the simple averages used by calculate_rsi.
+
+    :param pre: dict - Output of precompute
+    :param period: int - Averaging period in days
+    :return: ndarray - RSI values, shape (days, tickers)
+    """
+    counts = _window_sum(pre['valid_csum'], period)
+    gain = _window_sum(pre['gain_csum'], period)
+    loss = _window_sum(pre['loss_csum'], period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + gain / loss)
+    return np.where(counts == period, values, np.nan)
+
+# ======== Strategies ========
+
+def ma_crossover_positions(pre, short_window=50, long_window=200):
+    """
+    Golden-cross positions: long while the short MA is above the long MA.
+
+    :param pre: dict - Output of precompute
+    :param short_window: int - Short moving average window
+    :param long_window: int - Long moving average window
+    :return: ndarray - Positions (0 or 1) decided at each close
+    """
+    short_ma = rolling_mean(pre, short_window)
+    long_ma = rolling_mean(pre, long_window)
+    # NaN comparisons are False, so there is no position before both MAs exist
+    return (short_ma > long_ma).astype(np.float64)
+
+def _hold_last(signal):
+    """Forward-fill NaN entries along time, starting from 0."""
+    rows = np.where(np.isnan(signal), 0, np.arange(1, signal.shape[0] + 1)[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    padded = np.vstack([np.zeros((1, signal.shape[1])), signal])
+    return padded[rows, np.arange(signal.shape[1])]
+
+def rsi_reversion_positions(pre, period=14, lower=30, upper=70):
+    """
+    RSI mean-reversion positions: buy when RSI drops below lower, sell above upper.
+
+    :param pre: dict - Output of precompute
+    :param period: int - RSI period
+    :param lower: float - Oversold level that opens a position
+    :param upper: float - Overbought level that closes it
+    :return: ndarray - Positions (0 or 1) decided at each close
+    """
+    values = rsi(pre, period)
+    signal = np.full(values.shape, np.nan)
+    signal[values < lower] = 1.0
+    signal[values > upper] = 0.0
+    return _hold_last(signal)
+
+def strategy_positions(pre, strategy, params):
+    """
+    :param pre: dict - Output of precompute
+    :param strategy: str - One of STRATEGIES
+    :param params: dict - Keyword arguments of the strategy's position function
+    :return: ndarray - Positions, shape (days, tickers)
+    """
+    if strategy == 'ma_crossover':
+        return ma_crossover_positions(pre, **params)
+    if strategy == 'rsi_reversion':
+        return rsi_reversion_positions(pre, **params)
+    raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+# ======== Backtest ========
+
+def run_backtest(pre, positions, cost=0.0):
+    """
+    Equity curve, turnover and drawdown of holding the given positions.
+
+    A position decided at one close earns the next day's return.
+
+    :param pre: dict - Output of precompute
+    :param positions: ndarray - Positions per day and ticker
+    :param cost: float - Cost per unit of turnover, as a fraction (0.001 = 10 bp)
+    :return: dict - 'equity', 'drawdown', 'turnover' and 'returns' arrays
+    """
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    returns = held * pre['returns'] - cost * turnover
+    equity = np.cumprod(1 + returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    return {'equity': equity, 'drawdown': drawdown, 'turnover': turnover, 'returns': returns}
+
+def summarize(result):
+    """
+    Per-ticker statistics of a backtest.
+
+    :param result: dict - Output of run_backtest
+    :return: dict - 'total_return', 'max_drawdown', 'turnover' and 'sharpe' arrays
+    """
+    returns = result['returns']
+    std = returns.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(TRADING_DAYS), 0.0)
+    return {
+        'total_return': result['equity'][-1] - 1,
+        'max_drawdown': result['drawdown'].min(axis=0),
+        'turnover': result['turnover'].sum(axis=0),
+        'sharpe': sharpe,
+    }
+
+# ======== Parameter Grid Search ========
+
+def parameter_grid(**ranges):
+    """
+    Every combination of the given parameter values.
+
+    :param ranges: Parameter name mapped to a list of values
+    :return: list - One dict per combination
+    """
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*ranges.values())]
+
+def _grid_search_chunk(closes, tickers, strategy, grid, cost):
+    pre = precompute(closes)
+    frames = []
+    for params in grid:
+        if params.get('short_window', 0) >= params.get('long_window', np.inf):
+            continue
+        stats = summarize(run_backtest(pre, strategy_positions(pre, strategy, params), cost))
+        frame = pd.DataFrame(dict(stats, ticker=tickers))
+        frames.append(frame.assign(**params))
+    return frames
+
+def _combine_results(results, grid):
+    frames = [frame for chunk_frames in results for frame in chunk_frames]
+    if not frames:
+        return pd.DataFrame()
+    table = pd.concat(frames, ignore_index=True)
+    return table[list(grid[0]) + ['ticker', 'total_return', 'max_drawdown', 'turnover', 'sharpe']]
+
+def grid_search(prices, strategy, grid, cost=0.0, workers=None, chunk_size=250):
+    """
+    Backtest every parameter combination on every ticker.
+
+    Tickers are split into chunks that run in parallel processes; each chunk
+    computes its cumulative sums once and reuses them for the whole grid.
+    MA-crossover combinations with short_window >= long_window are skipped.
+
+    :param prices: DataFrame - Dates x tickers, e.g. from to_price_matrix
+    :param strategy: str - One of STRATEGIES
+    :param grid: list - Parameter dicts, e.g. from parameter_grid
+    :param cost: float - Cost per unit of turnover
+    :param workers: int - Worker processes (default: one per CPU; 1 runs inline)
+    :param chunk_size: int - Tickers per chunk
+    :return: DataFrame - One row per parameter combination and ticker
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+    tickers = list(prices.columns)
+    values = prices.to_numpy(dtype=np.float64)
+    chunks = [(values[:, i:i + chunk_size], tickers[i:i + chunk_size], strategy, grid, cost)
+              for i in range(0, len(tickers), chunk_size)]
+
+    if workers == 1:
+        results = [_grid_search_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_grid_search_chunk, *zip(*chunks)))
+    return _combine_results(results, grid)
+
+def _mapped_chunk(path, field, start, end, columns, strategy, grid, cost):
+    prices = PriceArray(path)
+    closes = prices.matrix(field, start, end)[:, columns]
+    return _grid_search_chunk(closes, prices.tickers[columns], strategy, grid, cost)
+
+def grid_search_mapped(path, strategy, grid, field='Close', start=None, end=None,
+                       cost=0.0, workers=None, chunk_size=250):
+    """
+    grid_search over a price file; workers map the file instead of receiving copies.
+
+    :param path: str - Price file written by price_mmap.write_price_file
+    :param field: str - Price field to backtest on
+    :param start: str - First date (default: start of file)
+    :param end: str - Last date (default: end of file)
+    :return: DataFrame - Same as grid_search
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+    n_tickers = len(PriceArray(path).tickers)
+    chunks = [(path, field, start, end, slice(i, i + chunk_size), strategy, grid, cost)
+              for i in range(0, n_tickers, chunk_size)]
+
+    if workers == 1:
+        results = [_mapped_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_mapped_chunk, *zip(*chunks)))
+    return _combine_results(results, grid)
+
+if __name__ == "__main__":
+    import time
+
+    # Example usage: 10-by-10 golden-cross sweep over synthetic random-walk prices
+    n_days, n_tickers = 10 * TRADING_DAYS, 3000
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2015-01-01', periods=n_days)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, n_tickers)), axis=0)),
+                          index=dates, columns=[f'T{i:04d}' for i in range(n_tickers)])
+    grid = parameter_grid(short_window=list(range(10, 110, 10)), long_window=list(range(120, 320, 20)))
+
+    start = time.perf_counter()
+    results = grid_search(prices, 'ma_crossover', grid, cost=0.001)
+    print(f"{len(grid)} parameter sets x {n_tickers} tickers x {n_days} days "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(results.groupby(['short_window', 'long_window'])['sharpe'].mean().nlargest(5))
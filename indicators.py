@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Indicator registry with dependency-aware evaluation.
+
+Every indicator declares the series it is computed from: price columns such
+as 'Close', or shared intermediates such as 'returns', 'diff' or a rolling
+average. compute_indicators resolves the requested indicators into a
+dependency graph and evaluates each node exactly once, so intermediates are
+shared and anything no chart asked for is never computed.
+
+Custom indicators are added with the indicator decorator:
+
+    @indicator('Momentum 10', inputs=['Close'], lookback=10)
+    def momentum_10(close):
+        return close - close.shift(10)
+
+The lookback (how many earlier rows a value depends on, None if unbounded)
+lets update_indicators recompute only the rows a data correction affects.
+"""
+
+import numpy as np
+
+INDICATORS = {}
+
+# ======== Registry ========
+
+def indicator(name, inputs, lookback=0):
+    """
+    Register a function as an indicator.
+
+    :param name: str - Name of the resulting series (the DataFrame column if requested)
+    :param inputs: list - Price columns or registered names the function takes, in order
+    :param lookback: int - Earlier input rows each value depends on (None: all of them)
+    :return: function - Decorator registering the function
+    """
+    def register(func):
+        if name in INDICATORS:
+            raise ValueError(f"Indicator {name!r} is already registered")
+        INDICATORS[name] = {'func': func, 'inputs': list(inputs), 'lookback': lookback}
+        return func
+    return register
+
+def rolling_mean(name, source, window):
+    """
+    Register a rolling mean of another series.
+
+    :param name: str - Name of the indicator
+    :param source: str - Series to average
+    :param window: int - Window length in rows
+    """
+    indicator(name, inputs=[source], lookback=window - 1)(lambda series: series.rolling(window=window).mean())
+
+def evaluation_order(names, columns=()):
+    """
+    Dependency-first order of every node needed for the requested indicators.
+
+    :param names: list - Requested indicator names
+    :param columns: iterable - Columns available in the data, which need no evaluation
+    :return: list - Registered names to evaluate, each once
+    """
+    columns = set(columns)
+    order, done, visiting = [], set(), set()
+
+    def visit(name):
+        if name in done or name in columns:
+            return
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator or missing column {name!r}")
+        if name in visiting:
+            raise ValueError(f"Indicator {name!r} depends on itself")
+        visiting.add(name)
+        for dependency in INDICATORS[name]['inputs']:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+def compute_indicators(data, names):
+    """
+    Add the requested indicators to a price DataFrame.
+
+    Intermediates are computed once and only the requested names become
+    columns. Anything already a column of the data is used as-is.
+
+    :param data: DataFrame - Stock price data (e.g. fetch_stock_data output)
+    :param names: list - Indicator names to add
+    :return: DataFrame - Data with the requested indicator columns added
+    """
+    values = {}
+
+    def series(name):
+        return values[name] if name in values else data[name]
+
+    for name in evaluation_order(names, data.columns):
+        spec = INDICATORS[name]
+        values[name] = spec['func'](*[series(dependency) for dependency in spec['inputs']])
+    for name in names:
+        if name in values:
+            data[name] = values[name]
+    return data
+
+def total_lookback(names):
+    """
+    Earlier source rows the given indicators depend on, through all their inputs.
+
+    :param names: list - Indicator names
+    :return: int or None - Rows of history needed, None if unbounded
+    """
+    total = 0
+    for name in names:
+        if name not in INDICATORS:
+            continue
+        spec = INDICATORS[name]
+        inherited = total_lookback(spec['inputs'])
+        if spec['lookback'] is None or inherited is None:
+            return None
+        total = max(total, spec['lookback'] + inherited)
+    return total
+
+def source_columns(names):
+    """
+    Data columns the given indicators are ultimately computed from.
+
+    :param names: list - Indicator names
+    :return: list - Column names, e.g. ['Close']
+    """
+    sources = []
+    for name in names:
+        for column in (source_columns(INDICATORS[name]['inputs']) if name in INDICATORS else [name]):
+            if column not in sources:
+                sources.append(column)
+    return sources
+
+def update_indicators(previous, data, names):
+    """
+    Indicators for corrected or extended data, recomputing only affected rows.
+
+    A change in a source row can only affect the rows up to the indicators'
+    lookback after it, so only that span (plus any appended rows) is
+    recomputed, from just enough earlier history. Anything the shortcut
+    cannot handle (a different index, unbounded lookback) is recomputed in
+    full.
+
+    :param previous: DataFrame - Earlier output of compute_indicators, or None
+    :param data: DataFrame - New source data; its index must extend previous's index
+    :param names: list - Indicator names, as passed to compute_indicators
+    :return: DataFrame - Data with the indicator columns added
+    """
+    sources = source_columns(names)
+    lookback = total_lookback(names)
+    n_old = 0 if previous is None else len(previous)
+    if (previous is None or lookback is None or any(name not in previous for name in names)
+            or n_old > len(data) or not previous.index.equals(data.index[:n_old])):
+        return compute_indicators(data, names)
+
+    old = previous[sources].to_numpy(dtype=np.float64)
+    new = data[sources].iloc[:n_old].to_numpy(dtype=np.float64)
+    changed = np.flatnonzero(~((old == new) | (np.isnan(old) & np.isnan(new))).all(axis=1))
+    first = changed[0] if len(changed) else n_old
+    if len(data) > n_old:
+        end = len(data)
+    elif len(changed):
+        end = min(n_old, changed[-1] + lookback + 1)
+    else:
+        end = n_old
+
+    for name in names:
+        data[name] = previous[name].reindex(data.index)
+    if first < end:
+        history = max(0, first - lookback)
+        window = compute_indicators(data[sources].iloc[history:end].copy(), names)
+        for name in names:
+            data.iloc[first:end, data.columns.get_loc(name)] = window[name].iloc[first - history:].to_numpy()
+    return data
+
+# ======== Shared Intermediates ========
+
+@indicator('returns', inputs=['Close'], lookback=1)
+def returns(close):
+    return close.pct_change()
+
+@indicator('diff', inputs=['Close'], lookback=1)
+def diff(close):
+    return close.diff()
+
+@indicator('gain', inputs=['diff'])
+def gain(delta):
+    return delta.where(delta > 0, 0)
+
+@indicator('loss', inputs=['diff'])
+def loss(delta):
+    return -delta.where(delta < 0, 0)
+
+rolling_mean('avg_gain_14', 'gain', 14)
+rolling_mean('avg_loss_14', 'loss', 14)
+
+# ======== Dashboard Indicators ========
+
+rolling_mean('MA50', 'Close', 50)
+rolling_mean('MA200', 'Close', 200)
+
+@indicator('Price Change (%)', inputs=['returns'])
+def price_change(returns):
+    return returns * 100
+
+# Standard deviation of price changes over a rolling window
+@indicator('Volatility', inputs=['Price Change (%)'], lookback=13)
+def volatility(price_change):
+    return price_change.rolling(window=14).std()
+
+@indicator('RSI', inputs=['avg_gain_14', 'avg_loss_14'])
+def rsi(avg_gain, avg_loss):
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+# ======== Optional Indicators ========
+
+@indicator('EMA12', inputs=['Close'], lookback=None)
+def ema_12(close):
+    return close.ewm(span=12, adjust=False).mean()
+
+@indicator('EMA26', inputs=['Close'], lookback=None)
+def ema_26(close):
+    return close.ewm(span=26, adjust=False).mean()
+
+@indicator('MACD', inputs=['EMA12', 'EMA26'])
+def macd(ema_fast, ema_slow):
+    return ema_fast - ema_slow
+
+@indicator('MACD Signal', inputs=['MACD'], lookback=None)
+def macd_signal(macd):
+    return macd.ewm(span=9, adjust=False).mean()
+
+rolling_mean('MA20', 'Close', 20)
+
+@indicator('std20', inputs=['Close'], lookback=19)
+def std_20(close):
+    return close.rolling(window=20).std()
+
+@indicator('Bollinger Upper', inputs=['MA20', 'std20'])
+def bollinger_upper(middle, std):
+    return middle + 2 * std
+
+@indicator('Bollinger Lower', inputs=['MA20', 'std20'])
+def bollinger_lower(middle, std):
+    return middle - 2 * std
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    # Example usage: RSI and Bollinger Bands share nothing, MACD reuses its EMAs
+    close = pd.Series(100 + np.random.default_rng(0).standard_normal(300).cumsum(), name='Close')
+    requested = ['RSI', 'MACD', 'MACD Signal', 'Bollinger Upper', 'Bollinger Lower']
+    print("Evaluation order:", evaluation_order(requested, ['Close']))
+    print(compute_indicators(close.to_frame(), requested).tail())
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Validation and cleaning between fetching price history and computing indicators.
+
+clean_history checks daily US equity data against the NYSE trading
+calendar, counting (and on request filling) missing sessions, and removes
+one-bar price spikes, all with vectorized NumPy masks. For raw (split-unadjusted) input it can also undo the price jumps on
+the split days listed in the 'Stock Splits' column. ingest runs it for one
+ticker and records per-ticker data-quality stats, kept for the most
+recently ingested DATA_QUALITY_SIZE tickers.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay,
+                                    USMartinLutherKingJr, USMemorialDay, USPresidentsDay,
+                                    USThanksgivingDay, nearest_workday, sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Plain US listings (IBM, BRK-B); exchange suffixes (.T, .L), indexes (^) and FX/futures (=X, =F)
+# trade on other calendars
+US_EQUITY_PATTERN = re.compile(r'^[A-Z]{1,5}(-[A-Z])?$')
+
+# One-off full-day NYSE closures: 9/11, days of mourning and Hurricane Sandy
+SPECIAL_CLOSURES = pd.DatetimeIndex(['2001-09-11', '2001-09-12', '2001-09-13', '2001-09-14', '2004-06-11',
+                                     '2007-01-02', '2012-10-29', '2012-10-30', '2018-12-05', '2025-01-09'])
+
+# Robust z-score above which a one-bar move that reverses the next bar is a spike
+SPIKE_THRESHOLD = 8.0
+
+# Per-ticker stats from the most recent ingest, least recently ingested first
+DATA_QUALITY_SIZE = 1000
+_data_quality = OrderedDict()
+_data_quality_lock = threading.Lock()
+
+# ======== Trading Calendar ========
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Regular NYSE holidays. One-off closures are in SPECIAL_CLOSURES; any not listed
+    there show up as missing sessions.
+    """
+    rules = [
+        Holiday('New Years Day', month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+TRADING_DAY = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+def trading_sessions(start, end, tz=None):
+    """
+    :param start: Timestamp - First day
+    :param end: Timestamp - Last day
+    :param tz: str - Timezone of the returned dates (e.g. that of a yfinance index)
+    :return: DatetimeIndex - Midnight of every NYSE session between start and end
+    """
+    start = pd.Timestamp(start).tz_localize(None).normalize()
+    end = pd.Timestamp(end).tz_localize(None).normalize()
+    sessions = pd.date_range(start, end, freq=TRADING_DAY).difference(SPECIAL_CLOSURES)
+    return sessions.tz_localize(tz) if tz is not None else sessions
+
+def _is_daily(index):
+    return len(index) > 1 and (index.normalize() == index).all()
+
+# ======== Cleaning ========
+
+def _split_multipliers(close, splits):
+    """
+    Price multiplier per bar that undoes unadjusted splits after it.
+
+    Only days with a split ratio in splits are candidates, and only those
+    whose jump is closer to the split's price change than to no change are
+    unadjusted; already adjusted data is left alone.
+
+    :param close: ndarray - Closing prices
+    :param splits: ndarray - Split ratio per bar (yfinance 'Stock Splits', 0 for none; 2 is 2-for-1)
+    :return: (ndarray, int) - Multipliers and the number of split jumps found
+    """
+    log_jump = np.zeros(len(close))
+    log_jump[1:] = np.log(close[1:] / close[:-1])
+    log_ratio = np.log(np.where(splits > 0, splits, 1.0))
+    is_split = (splits > 0) & (np.abs(log_jump + log_ratio) < np.abs(log_jump))
+    is_split[0] = False
+    step = np.where(is_split, np.exp(-log_ratio), 1.0)
+    # Every bar is scaled by the product of the split steps after it
+    after = np.cumprod(step[::-1])[::-1]
+    return np.append(after[1:], 1.0), int(is_split.sum())
+
+def _spike_mask(close):
+    """
+    Bars whose price jumps far out of line and comes straight back next bar.
+
+    :param close: ndarray - Closing prices without NaN
+    :return: ndarray - Boolean mask of spike bars
+    """
+    log_return = np.diff(np.log(close))
+    if len(log_return) < 3:
+        return np.zeros(len(close), dtype=bool)
+    median = np.median(log_return)
+    mad = 1.4826 * np.median(np.abs(log_return - median))
+    if mad == 0:
+        return np.zeros(len(close), dtype=bool)
+    z = (log_return - median) / mad
+    out, back = z[:-1], z[1:]
+    spike = ((np.abs(out) > SPIKE_THRESHOLD) & (np.abs(back) > SPIKE_THRESHOLD) & (np.sign(out) != np.sign(back))
+             & (np.abs(log_return[:-1] + log_return[1:]) < 0.5 * np.abs(log_return[:-1])))
+    mask = np.zeros(len(close), dtype=bool)
+    mask[1:-1] = spike
+    return mask
+
+def clean_history(data, check_calendar=True, fill_gaps=False, adjust_splits=False, remove_spikes=True):
+    """
+    Validate and clean one ticker's price history.
+
+    Missing NYSE sessions (daily data only) are counted, and only added when
+    fill_gaps is set. NaN prices, and added sessions, are filled with the
+    previous close and zero volume and marked in a boolean 'Filled' column.
+    Zero-volume bars are only counted.
+
+    :param data: DataFrame - Output of fetch_stock_data
+    :param check_calendar: bool - Compare the dates with the NYSE calendar (US equities only;
+                           missing_sessions and extra_sessions are None otherwise)
+    :param fill_gaps: bool - Add previous-close rows for missing sessions, so rolling
+                      windows span a fixed number of sessions
+    :param adjust_splits: bool - Rescale prices before unadjusted split days in 'Stock Splits'
+                          (off by default: yfinance history() is already split-adjusted)
+    :param remove_spikes: bool - Replace the prices of one-bar spikes by log-linear
+                          interpolation between their neighbours
+    :return: (DataFrame, dict) - Cleaned data and its data-quality stats
+    """
+    stats = {'rows': len(data), 'duplicates': 0, 'missing_sessions': 0, 'extra_sessions': 0,
+             'nan_prices': 0, 'zero_volume': 0, 'split_jumps': 0, 'spikes': 0}
+    if data.empty or 'Close' not in data:
+        return data, stats
+
+    duplicated = data.index.duplicated(keep='last')
+    stats['duplicates'] = int(duplicated.sum())
+    data = data[~duplicated].sort_index()
+
+    if not check_calendar:
+        stats['missing_sessions'] = stats['extra_sessions'] = None
+    elif _is_daily(data.index):
+        sessions = trading_sessions(data.index[0], data.index[-1], data.index.tz)
+        missing = sessions.difference(data.index)
+        stats['missing_sessions'] = len(missing)
+        stats['extra_sessions'] = len(data.index.difference(sessions))
+        if fill_gaps and len(missing):
+            data = data.reindex(data.index.union(missing))
+
+    prices = [column for column in PRICE_COLUMNS if column in data]
+    close = data['Close'].to_numpy(dtype=np.float64)
+    filled = np.isnan(close)
+    stats['nan_prices'] = int(filled.sum()) - (stats['missing_sessions'] if fill_gaps and check_calendar else 0)
+    if 'Volume' in data:
+        stats['zero_volume'] = int(((data['Volume'].to_numpy() == 0) & ~filled).sum())
+
+    valid = ~filled
+    if adjust_splits and 'Stock Splits' in data and valid.sum() > 1:
+        splits = data['Stock Splits'].fillna(0).to_numpy(dtype=np.float64)
+        multipliers, stats['split_jumps'] = _split_multipliers(close[valid], splits[valid])
+        if stats['split_jumps']:
+            scale = np.ones(len(close))
+            scale[valid] = multipliers
+            scale = pd.Series(scale).where(valid).bfill().fillna(1.0).to_numpy()
+            data = data.copy()
+            data[prices] = data[prices].to_numpy() * scale[:, None]
+            if 'Volume' in data:
+                data['Volume'] = data['Volume'] / scale
+            close = data['Close'].to_numpy(dtype=np.float64)
+
+    if remove_spikes and valid.sum() > 3:
+        spikes = np.zeros(len(close), dtype=bool)
+        spikes[valid] = _spike_mask(close[valid])
+        stats['spikes'] = int(spikes.sum())
+        if stats['spikes']:
+            # Interpolating every price column the same way keeps Low <= Open, Close <= High
+            data = data.copy()
+            for column in prices:
+                logs = np.log(data[column].to_numpy(dtype=np.float64))
+                logs = pd.Series(logs).mask(spikes).interpolate(limit_area='inside').to_numpy()
+                data.iloc[np.flatnonzero(spikes), data.columns.get_loc(column)] = np.exp(logs[spikes])
+
+    # Forward-fill gaps: missing bars repeat the previous close with no volume
+    if filled.any():
+        data = data.copy()
+        last_close = data['Close'].ffill()
+        for column in prices:
+            data[column] = data[column].where(~filled, last_close)
+        if 'Volume' in data:
+            data['Volume'] = data['Volume'].where(~filled, 0)
+    data['Filled'] = filled
+    return data, stats
+
+def ingest(ticker, data):
+    """
+    Clean a freshly fetched history and record its data-quality stats.
+
+    Only plain US listings are checked against the NYSE calendar, and missing
+    sessions are reported but not filled.
+
+    :param ticker: str - Stock ticker symbol
+    :param data: DataFrame - Output of fetch_stock_data
+    :return: DataFrame - Cleaned data, ready for the indicators
+    """
+    cleaned, stats = clean_history(data, check_calendar=bool(US_EQUITY_PATTERN.match(ticker)))
+    if not cleaned.empty:
+        stats['first'] = str(cleaned.index[0].date())
+        stats['last'] = str(cleaned.index[-1].date())
+    with _data_quality_lock:
+        _data_quality.pop(ticker, None)
+        _data_quality[ticker] = stats
+        while len(_data_quality) > DATA_QUALITY_SIZE:
+            _data_quality.popitem(last=False)
+    return cleaned
+
+def data_quality_report():
+    """
+    :return: dict - Data-quality stats per recently ingested ticker (a copy)
+    """
+    with _data_quality_lock:
+        return dict(_data_quality)
+
+if __name__ == "__main__":
+    from offline_data import fetch_offline_stock_data
+
+    # Missing sessions are flagged, and only filled on request; 2025-01-09 was a closure, not a gap
+    history = fetch_offline_stock_data('IBM', end='2025-03-31')
+    history = history[history.index.isin(trading_sessions(history.index[0], history.index[-1], history.index.tz))]
+    assert not history.index.tz_localize(None).isin(['2025-01-09']).any()
+    gappy = history.drop(history.index[[50, 51, 120]])
+    cleaned, stats = clean_history(gappy)
+    assert stats['missing_sessions'] == 3 and len(cleaned) == len(gappy) and not cleaned['Filled'].any(), stats
+    cleaned, stats = clean_history(gappy, fill_gaps=True)
+    assert stats['missing_sessions'] == 3 and stats['nan_prices'] == 0 and cleaned['Filled'].sum() == 3, stats
+    cleaned = ingest('7203.T', gappy)
+    assert data_quality_report()['7203.T']['missing_sessions'] is None and len(cleaned) == len(gappy)
+
+    # Regression checks: real gaps of +52% and -50% are not splits, a raw 2-for-1 split is undone,
+    # and a spike is removed from every price column
+    history = fetch_offline_stock_data('IBM', end='2024-12-31')
+    history = history[history.index.isin(trading_sessions(history.index[0], history.index[-1], history.index.tz))]
+    gapped = history.copy()
+    gapped.iloc[100:, :4] *= 1.52
+    gapped.iloc[180:, :4] *= 0.5
+    for adjust in (False, True):
+        cleaned, stats = clean_history(gapped, adjust_splits=adjust)
+        assert stats['split_jumps'] == 0 and np.allclose(cleaned['Close'], gapped['Close']), stats
+
+    raw = history.copy()
+    raw.iloc[150:, :4] /= 2
+    raw.iloc[150:, raw.columns.get_loc('Volume')] *= 2
+    raw.iloc[150, raw.columns.get_loc('Stock Splits')] = 2.0
+    cleaned, stats = clean_history(raw, adjust_splits=True)
+    assert stats['split_jumps'] == 1 and np.allclose(cleaned['Close'], history['Close'] / 2), stats
+    cleaned, stats = clean_history(history.assign(**{'Stock Splits': 2.0 * (np.arange(len(history)) == 150)}),
+                                   adjust_splits=True)
+    assert stats['split_jumps'] == 0, stats
+
+    spiked = history.copy()
+    spiked.iloc[60, :4] *= 3
+    cleaned, stats = clean_history(spiked)
+    bar = cleaned.iloc[60]
+    assert stats['spikes'] == 1 and bar['Low'] <= min(bar['Open'], bar['Close']) <= max(bar['Open'], bar['Close']) <= bar['High'], stats
+    assert abs(np.log(bar['Close'] / history['Close'].iloc[60])) < 0.1
+    print("All ingestion checks passed")
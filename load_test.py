@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Load test for the Stock Savvy dashboard.
+
+Starts the dashboard in a separate server process on the offline data
+provider, then ramps up virtual users. Each user loads the page and replays
+a click stream of company dropdown changes and tab switches. Dropdown
+changes hit the _dash-update-component endpoint exactly when the browser
+would: when the figure-cache store has no fresh copy of the ticker (or
+always with --no-client-cache). Tab switches are rendered in the browser
+and cost no request. No browser is needed.
+
+For each ramp stage it prints latency percentiles, throughput and the
+server's resident memory (all worker processes together).
+
+Example:
+    python load_test.py --users 1,10,50,100,200 --stage-seconds 30 --processes 1
+"""
+
+import argparse
+import gzip
+import importlib.util
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+DASHBOARD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '6060_MELCHIZEDEK_STOCKDASHBOARD.py')
+
+# How often each listed company is picked, in stock_options order
+TICKER_POPULARITY = [0.35, 0.2, 0.2, 0.15, 0.1]
+
+# Share of clicks that are dropdown changes; the rest are tab switches
+DROPDOWN_SHARE = 0.4
+
+# ======== Server ========
+
+def load_dashboard(fetch_latency=0.0):
+    """
+    Import the dashboard module with fetch_stock_data replaced by the offline provider.
+
+    :param fetch_latency: float - Seconds each fetch sleeps, to mimic a market data API
+    :return: module - The dashboard module
+    """
+    from offline_data import fetch_offline_stock_data
+
+    spec = importlib.util.spec_from_file_location('stock_dashboard', DASHBOARD_FILE)
+    dashboard = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(dashboard)
+
+    def fetch_stock_data(ticker, period='1y', interval='1d'):
+        if fetch_latency:
+            time.sleep(fetch_latency)
+        return fetch_offline_stock_data(ticker, period, interval)
+
+    dashboard.fetch_stock_data = fetch_stock_data
+    return dashboard
+
+def serve(port, processes=1, fetch_latency=0.0):
+    """
+    Run the dashboard on the offline data provider (blocks).
+
+    With several processes the dashboard is imported once and a pool of
+    long-lived threaded workers is pre-forked on one listening socket, as
+    gunicorn -w N --preload does. Each worker keeps its own server-side
+    caches across requests. (werkzeug's own processes option forks a fresh
+    child per request, so no cache would outlive a request.)
+
+    :param port: int - Port to listen on (localhost only)
+    :param processes: int - Worker processes; more than 1 needs os.fork (POSIX)
+    :param fetch_latency: float - Seconds each stock data fetch sleeps
+    """
+    from werkzeug.serving import make_server
+
+    dashboard = load_dashboard(fetch_latency)
+    # Per-request access logs would dominate the output
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if processes == 1:
+        dashboard.app.server.run(host='127.0.0.1', port=port, threaded=True)
+        return
+    if not hasattr(os, 'fork'):
+        raise RuntimeError("More than one server process needs os.fork, which this platform lacks")
+
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', port))
+    listener.listen(128)
+    workers = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            make_server('127.0.0.1', port, dashboard.app.server, threaded=True, fd=listener.fileno()).serve_forever()
+            os._exit(0)
+        workers.append(pid)
+
+    def stop(signum, frame):
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in workers:
+            os.waitpid(pid, 0)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in workers:
+        os.waitpid(pid, 0)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def process_rss(pid):
+    """
+    Resident memory of a process and all its descendants.
+
+    :param pid: int - Root process id
+    :return: int - Bytes, or 0 if it cannot be read
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [root] + root.children(recursive=True))
+        except psutil.Error:
+            return 0
+
+    # Linux without psutil: walk /proc for the process tree
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    tree, frontier = {pid}, [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent and child not in tree]
+        tree.update(children)
+        frontier.extend(children)
+    total = 0
+    for member in tree:
+        try:
+            with open(f'/proc/{member}/status') as f:
+                total += next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            continue
+    return total
+
+# ======== Virtual Users ========
+
+class VirtualUser(threading.Thread):
+    """
+    One simulated analyst clicking through the dashboard until stopped.
+    """
+
+    def __init__(self, base_url, tickers, max_age, results, stop, seed, think_time=1.0, client_cache=True):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.tickers = tickers
+        self.max_age = max_age
+        self.results = results
+        self.stop = stop
+        self.rng = np.random.default_rng(seed)
+        self.think_time = think_time
+        self.client_cache = client_cache
+        self.cache = {}  # ticker -> {'version': ..., 'checked': ms}, mirrors the figure-cache store
+        self.session_id = None
+
+    def _record(self, kind, started, ok):
+        self.results.append((kind, time.time(), time.perf_counter() - started, ok))
+
+    def _request(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            payload = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                payload = gzip.decompress(payload)
+            return response.status, payload
+
+    def load_page(self):
+        started = time.perf_counter()
+        try:
+            self._request('/')
+            status, payload = self._request('/_dash-layout')
+            store = json.loads(payload)['props']['children'][0]
+            self.session_id = store['props']['data']
+            self._record('page', started, status == 200)
+        except Exception:
+            self._record('page', started, False)
+            raise
+
+    def select_ticker(self, ticker):
+        now = time.time() * 1000
+        entry = self.cache.get(ticker)
+        if self.client_cache and entry and now - entry['checked'] < self.max_age * 1000:
+            self.results.append(('cached', time.time(), 0.0, True))
+            return
+        ordered = sorted(self.cache, key=lambda t: self.cache[t]['checked'])
+        figure_request = {'ticker': ticker, 'version': entry['version'] if entry and self.client_cache else None,
+                          'requested': now, 'cached': ordered}
+        body = {
+            'output': 'figure-cache.data',
+            'outputs': {'id': 'figure-cache', 'property': 'data'},
+            'inputs': [{'id': 'figure-request', 'property': 'data', 'value': figure_request}],
+            'state': [{'id': 'session-id', 'property': 'data', 'value': self.session_id}],
+            'changedPropIds': ['figure-request.data'],
+        }
+        started = time.perf_counter()
+        try:
+            status, payload = self._request('/_dash-update-component', body)
+        except Exception:
+            self._record('update', started, False)
+            return
+        self._record('update', started, status in (200, 204))
+        if status == 200:
+            self._apply_patch(json.loads(payload)['response']['figure-cache']['data'])
+
+    def _apply_patch(self, patch):
+        for operation in patch.get('operations', []):
+            location, value = operation['location'], operation.get('params', {}).get('value')
+            if operation['operation'] == 'Delete':
+                self.cache.pop(location[0], None)
+            elif len(location) == 1:
+                self.cache[location[0]] = {'version': value['version'], 'checked': value['checked']}
+            elif location[0] in self.cache:
+                self.cache[location[0]][location[1]] = value
+
+    def run(self):
+        try:
+            self.load_page()
+        except Exception:
+            return
+        self.select_ticker(self.tickers[0])
+        while not self.stop.is_set():
+            if self.stop.wait(self.rng.exponential(self.think_time)):
+                break
+            if self.rng.random() < DROPDOWN_SHARE:
+                self.select_ticker(self.rng.choice(self.tickers, p=TICKER_POPULARITY[:len(self.tickers)]))
+            else:
+                self.results.append(('tab', time.time(), 0.0, True))
+
+# ======== Ramp ========
+
+def summarize_stage(users, results, started, ended, rss):
+    """
+    Statistics of the requests that finished during one stage.
+
+    :return: dict - Counts, throughput, latency percentiles (ms) and server RSS (MB)
+    """
+    stage = [r for r in results if started <= r[1] < ended]
+    latencies = np.array([r[2] for r in stage if r[0] == 'update' and r[3]]) * 1000
+    duration = ended - started
+    return {
+        'users': users,
+        'requests': int(sum(1 for r in stage if r[0] in ('update', 'page'))),
+        'throughput': sum(1 for r in stage if r[0] == 'update') / duration,
+        'p50': np.percentile(latencies, 50) if len(latencies) else float('nan'),
+        'p95': np.percentile(latencies, 95) if len(latencies) else float('nan'),
+        'p99': np.percentile(latencies, 99) if len(latencies) else float('nan'),
+        'errors': int(sum(1 for r in stage if not r[3])),
+        'cached': int(sum(1 for r in stage if r[0] == 'cached')),
+        'tabs': int(sum(1 for r in stage if r[0] == 'tab')),
+        'rss_mb': rss / 2**20,
+    }
+
+def run_load_test(user_stages, stage_seconds=20, processes=1, think_time=1.0,
+                  client_cache=True, fetch_latency=0.0, port=None):
+    """
+    Start a server, ramp virtual users through the stages and report each stage.
+
+    :param user_stages: list - Number of concurrent users in each stage, ascending
+    :param stage_seconds: float - Length of each stage
+    :param processes: int - Pre-forked server worker processes, each with its own caches
+    :param think_time: float - Mean seconds between a user's clicks
+    :param client_cache: bool - Emulate the browser figure cache
+    :param fetch_latency: float - Seconds each stock data fetch sleeps on the server
+    :param port: int - Server port (default: any free port)
+    :return: list - One summary dict per stage
+    """
+    port = port or free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port),
+                               '--processes', str(processes), '--fetch-latency', str(fetch_latency)])
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(base_url + '/', timeout=1).read()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError("Dashboard server did not start")
+                time.sleep(0.2)
+
+        dashboard = load_dashboard()
+        tickers = [option['value'] for option in dashboard.stock_options]
+        max_age = dashboard.FIGURE_CACHE_MAX_AGE
+
+        results, stop, users, summaries = [], threading.Event(), [], []
+        print(f"{'users':>6} {'requests':>9} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>7} {'cached':>7} {'tabs':>6} {'RSS MB':>8}")
+        for n_users in user_stages:
+            while len(users) < n_users:
+                user = VirtualUser(base_url, tickers, max_age, results, stop, seed=len(users),
+                                   think_time=think_time, client_cache=client_cache)
+                user.start()
+                users.append(user)
+            started = time.time()
+            peak_rss = 0
+            while time.time() - started < stage_seconds:
+                peak_rss = max(peak_rss, process_rss(server.pid))
+                time.sleep(min(1.0, stage_seconds))
+            summary = summarize_stage(n_users, results, started, time.time(), peak_rss)
+            summaries.append(summary)
+            print(f"{summary['users']:>6} {summary['requests']:>9} {summary['throughput']:>7.1f} "
+                  f"{summary['p50']:>8.1f} {summary['p95']:>8.1f} {summary['p99']:>8.1f} {summary['errors']:>7} "
+                  f"{summary['cached']:>7} {summary['tabs']:>6} {summary['rss_mb']:>8.1f}", flush=True)
+        stop.set()
+        for user in users:
+            user.join(timeout=5)
+        return summaries
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp simulated users against the Stock Savvy dashboard.")
+    parser.add_argument('--users', default='1,10,50,100,200',
+                        help="Comma-separated concurrent users per stage (default: %(default)s)")
+    parser.add_argument('--stage-seconds', type=float, default=20, help="Length of each stage (default: %(default)s)")
+    parser.add_argument('--processes', type=int, default=1, help="Pre-forked server worker processes, each with its own caches (default: %(default)s)")
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help="Mean seconds between a user's clicks (default: %(default)s)")
+    parser.add_argument('--no-client-cache', action='store_true',
+                        help="Send every dropdown change to the server, as without the browser figure cache")
+    parser.add_argument('--fetch-latency', type=float, default=0.0,
+                        help="Seconds each server-side stock data fetch sleeps (default: %(default)s)")
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.processes, args.fetch_latency)
+    else:
+        run_load_test([int(n) for n in args.users.split(',')], args.stage_seconds, args.processes,
+                      args.think_time, not args.no_client_cache, args.fetch_latency)
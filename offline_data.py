@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Offline stock data provider.
+
+Drop-in replacement for fetch_stock_data that needs no network: it returns
+a deterministic random-walk history per ticker with the same columns and
+timezone-aware index as yfinance's Ticker.history(). Used for load tests,
+benchmarks and working without market data access.
+"""
+
+import numpy as np
+import pandas as pd
+
+from sentiment_data import ticker_seed
+
+MARKET_TIMEZONE = 'America/New_York'
+
+# Trading days covered by each yfinance period
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252,
+               '2y': 504, '5y': 1260, '10y': 2520, 'max': 5040}
+
+# Bar length in minutes for intraday intervals; daily and longer are in days
+INTRADAY_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+DAILY_STEPS = {'1d': 1, '5d': 5, '1wk': 5, '1mo': 21, '3mo': 63}
+
+def _bar_times(period, interval, end=None):
+    """
+    Timestamps of every bar in a period, ending on the last business day.
+
+    :return: DatetimeIndex - Timezone-aware bar times
+    """
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period {period!r}, expected one of {list(PERIOD_DAYS)}")
+    end = pd.Timestamp.now(tz=MARKET_TIMEZONE).normalize() if end is None else pd.Timestamp(end)
+    days = pd.bdate_range(end=end.tz_localize(None) if end.tz else end, periods=PERIOD_DAYS[period])
+    if interval in DAILY_STEPS:
+        return days[::-1][::DAILY_STEPS[interval]][::-1].tz_localize(MARKET_TIMEZONE)
+    if interval not in INTRADAY_MINUTES:
+        raise ValueError(f"Unsupported interval {interval!r}")
+    step = INTRADAY_MINUTES[interval]
+    offsets = pd.to_timedelta(np.arange(0, 390, step), unit='min') + pd.Timedelta(hours=9, minutes=30)
+    times = (days.values[:, None] + offsets.values[None, :]).ravel()
+    return pd.DatetimeIndex(times).tz_localize(MARKET_TIMEZONE)
+
+def fetch_offline_stock_data(ticker, period='1y', interval='1d', end=None):
+    """
+    Synthetic price history shaped like yfinance's Ticker.history().
+
+    The same ticker, period, interval and end date always give the same data.
+
+    :param ticker: str - Stock ticker symbol
+    :param period: str - Time period for data ('5d', '1mo', '1y', etc.)
+    :param interval: str - Interval between data points ('1m', '1h', '1d', '1wk', etc.)
+    :param end: str or Timestamp - Last day of the history (default: today)
+    :return: DataFrame - Open, High, Low, Close, Volume, Dividends and Stock Splits
+    """
+    if ticker is None:
+        return pd.DataFrame()
+    index = _bar_times(period, interval, end)
+    n = len(index)
+    rng = np.random.default_rng([ticker_seed(ticker), n])
+    # About 1.5% daily volatility, spread over the bars of a day
+    bars_per_day = n / PERIOD_DAYS[period]
+    start_price = 20 + ticker_seed(ticker) % 400
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0003 / bars_per_day, 0.015 / np.sqrt(bars_per_day), n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0075 / np.sqrt(bars_per_day), n)) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 10_000_000, n),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=pd.DatetimeIndex(index, name='Date'))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Portfolio aggregation over many holdings.
+
+A PortfolioModel is built once per set of tickers from their price
+histories: one date-aligned matrix of closes and daily returns, and the
+covariance matrix of those returns. Everything that depends on the holdings
+(equity, weighted returns, volatility, per-position contributions) is then a
+few matrix-vector products. PortfolioView keeps those products for the
+current holdings, and a change to a few positions only adds the changed
+columns' share instead of recomputing from the data.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# Ticker symbols accepted in the holdings box (e.g. IBM, BRK-B, ^GSPC, EURUSD=X)
+TICKER_PATTERN = re.compile(r'^\^?[A-Z0-9][A-Z0-9.\-=]{0,14}$')
+
+# Below this share of changed positions a view is updated column by column
+INCREMENTAL_SHARE = 0.25
+
+# ======== Holdings ========
+
+def parse_holdings(text, max_positions=None):
+    """
+    Parse holdings entered one per line as "TICKER SHARES".
+
+    Commas also separate entries, and repeated tickers are added up.
+
+    :param text: str - Holdings, e.g. "IBM 10\\nMSFT 5"
+    :param max_positions: int - Most positions accepted (default: no limit)
+    :return: (dict, list) - Shares per ticker in input order, and the entries that could not be read
+    """
+    holdings, errors = {}, []
+    for entry in re.split(r'[\n,;]+', text or ''):
+        parts = entry.split()
+        if not parts:
+            continue
+        ticker = parts[0].upper()
+        try:
+            shares = float(parts[1]) if len(parts) == 2 else None
+        except ValueError:
+            shares = None
+        if shares is None or not np.isfinite(shares) or not TICKER_PATTERN.match(ticker):
+            errors.append(entry.strip())
+        elif ticker in holdings or max_positions is None or len(holdings) < max_positions:
+            holdings[ticker] = holdings.get(ticker, 0.0) + shares
+        else:
+            errors.append(entry.strip())
+    return holdings, errors
+
+# ======== Aligned Data ========
+
+def aligned_closes(histories):
+    """
+    Closing prices of several tickers on one date index.
+
+    Dates are the union of every ticker's trading days. Gaps are carried
+    forward, and days before a ticker's first price take that first price,
+    so the position adds no return before it starts trading.
+
+    :param histories: dict - Ticker to price DataFrame (fetch_stock_data output)
+    :return: DataFrame - One column of closes per ticker with data
+    """
+    closes = {}
+    for ticker, data in histories.items():
+        if data is None or data.empty or 'Close' not in data:
+            continue
+        close = data['Close']
+        dates = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        closes[ticker] = pd.Series(close.to_numpy(dtype=np.float64), index=dates.normalize())
+    if not closes:
+        return pd.DataFrame()
+    frame = pd.DataFrame({ticker: close[~close.index.duplicated(keep='last')] for ticker, close in closes.items()})
+    return frame.sort_index().ffill().bfill()
+
+class PortfolioModel:
+    """
+    Holdings-independent data for a set of tickers: prices, returns and their covariance.
+
+    Shared between sessions, so it is never modified after construction.
+    """
+
+    def __init__(self, histories):
+        """
+        :param histories: dict - Ticker to price DataFrame (fetch_stock_data output)
+        """
+        closes = aligned_closes(histories)
+        self.tickers = list(closes.columns)
+        self.dates = closes.index
+        self.positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.prices = closes.to_numpy()
+        self.last_prices = self.prices[-1] if len(self.prices) else np.zeros(len(self.tickers))
+        self.returns = np.zeros_like(self.prices)
+        self.returns[1:] = self.prices[1:] / self.prices[:-1] - 1
+        self.mean_returns = self.returns[1:].mean(axis=0) if len(self.prices) > 1 else np.zeros(len(self.tickers))
+        centered = self.returns[1:] - self.mean_returns
+        self.covariance = centered.T @ centered / max(len(centered) - 1, 1)
+        self.period_returns = self.prices[-1] / self.prices[0] - 1 if len(self.prices) else np.zeros(len(self.tickers))
+
+    @property
+    def nbytes(self):
+        """
+        :return: int - Memory held by the model's arrays, for cache budgets
+        """
+        arrays = [self.prices, self.returns, self.covariance, self.mean_returns, self.period_returns, self.last_prices]
+        return sum(array.nbytes for array in arrays) + self.dates.nbytes
+
+    def exposures(self, holdings):
+        """
+        :param holdings: dict - Shares per ticker; tickers without data are ignored
+        :return: (ndarray, ndarray) - Shares and market value per position, in self.tickers order
+        """
+        shares = np.zeros(len(self.tickers))
+        for ticker, count in holdings.items():
+            if ticker in self.positions:
+                shares[self.positions[ticker]] = count
+        return shares, shares * self.last_prices
+
+    def view(self, holdings):
+        """
+        :param holdings: dict - Shares per ticker
+        :return: PortfolioView - Aggregates for these holdings
+        """
+        return PortfolioView(self, holdings)
+
+class PortfolioView:
+    """
+    A PortfolioModel evaluated for one set of holdings, updatable in place.
+
+    Keeps the products of the holdings with the price, return and covariance
+    matrices. update() adds only the changed positions' columns when few
+    positions changed, so its cost grows with the size of the change rather
+    than with the size of the portfolio.
+    """
+
+    def __init__(self, model, holdings):
+        self.model = model
+        self.shares, self.values = model.exposures(holdings)
+        self._recompute()
+
+    def _recompute(self):
+        model = self.model
+        self.equity = model.prices @ self.shares
+        self.dollar_returns = model.returns @ self.values
+        self.dollar_covariance = model.covariance @ self.values
+
+    def update(self, holdings):
+        """
+        Switch to new holdings of the same tickers.
+
+        :param holdings: dict - Shares per ticker
+        :return: ndarray - Positions (indexes into model.tickers) that changed
+        """
+        model = self.model
+        shares, values = model.exposures(holdings)
+        changed = np.flatnonzero(shares != self.shares)
+        if len(changed) > INCREMENTAL_SHARE * len(shares):
+            self.shares, self.values = shares, values
+            self._recompute()
+        elif len(changed):
+            delta_shares = shares[changed] - self.shares[changed]
+            delta_values = values[changed] - self.values[changed]
+            self.equity += model.prices[:, changed] @ delta_shares
+            self.dollar_returns += model.returns[:, changed] @ delta_values
+            self.dollar_covariance += model.covariance[:, changed] @ delta_values
+            self.shares, self.values = shares, values
+        return changed
+
+    @property
+    def total_value(self):
+        return float(self.values.sum())
+
+    @property
+    def weights(self):
+        total = self.total_value
+        return self.values / total if total else np.zeros_like(self.values)
+
+    def weighted_returns(self):
+        """
+        :return: ndarray - Daily returns of the portfolio held at the current weights
+        """
+        total = self.total_value
+        return self.dollar_returns / total if total else np.zeros_like(self.dollar_returns)
+
+    def volatility(self):
+        """
+        :return: float - Annualized volatility from the covariance matrix, sqrt(w' C w)
+        """
+        total = self.total_value
+        if not total:
+            return 0.0
+        variance = float(self.values @ self.dollar_covariance) / total ** 2
+        return float(np.sqrt(max(variance, 0.0) * TRADING_DAYS))
+
+    def contributions(self):
+        """
+        Per-position share of the portfolio's value, return and risk.
+
+        Risk contributions w_i (C w)_i / sigma add up to the daily volatility
+        and are given as a fraction of it.
+
+        :return: DataFrame - Shares, value, weight, period return, P&L, return and risk contribution per ticker
+        """
+        model = self.model
+        total = self.total_value
+        weights = self.weights
+        variance = float(self.values @ self.dollar_covariance)
+        risk = self.values * self.dollar_covariance / variance if variance > 0 else np.zeros_like(self.values)
+        start_values = self.shares * (model.prices[0] if len(model.prices) else 0)
+        return pd.DataFrame({
+            'Shares': self.shares,
+            'Value': self.values,
+            'Weight': weights,
+            'Period Return': model.period_returns,
+            'P&L': self.values - start_values,
+            'Return Contribution': weights * model.mean_returns * TRADING_DAYS if total else 0.0,
+            'Risk Contribution': risk,
+        }, index=pd.Index(model.tickers, name='Ticker'))
+
+    def summary(self):
+        """
+        :return: dict - Total value, annualized return and volatility, and period return of the equity
+        """
+        daily = self.weighted_returns()
+        start = self.equity[0] if len(self.equity) else 0.0
+        return {
+            'value': self.total_value,
+            'annual_return': float(daily[1:].mean() * TRADING_DAYS) if len(daily) > 1 else 0.0,
+            'volatility': self.volatility(),
+            'period_return': float(self.equity[-1] / start - 1) if start else 0.0,
+        }
+
+if __name__ == "__main__":
+    import time
+
+    from offline_data import fetch_offline_stock_data
+
+    # Update latency for a 500-name portfolio when a few positions change
+    tickers = [f"T{i:03d}" for i in range(500)]
+    histories = {ticker: fetch_offline_stock_data(ticker) for ticker in tickers}
+    started = time.perf_counter()
+    model = PortfolioModel(histories)
+    print(f"Model for {len(tickers)} tickers x {len(model.dates)} days: {1000 * (time.perf_counter() - started):.1f} ms")
+
+    holdings = {ticker: 100.0 for ticker in tickers}
+    started = time.perf_counter()
+    view = model.view(holdings)
+    view.summary(), view.contributions()
+    print(f"First evaluation: {1000 * (time.perf_counter() - started):.2f} ms")
+
+    rng = np.random.default_rng(0)
+    timings = []
+    for _ in range(200):
+        for ticker in rng.choice(tickers, 5, replace=False):
+            holdings[ticker] = float(rng.integers(0, 500))
+        started = time.perf_counter()
+        view.update(holdings)
+        view.summary(), view.contributions()
+        timings.append(time.perf_counter() - started)
+    full = model.view(holdings)
+    print(f"Update (5 positions changed): median {1000 * np.median(timings):.2f} ms, max {1000 * max(timings):.2f} ms")
+    print("Matches full evaluation:", np.allclose(view.equity, full.equity)
+          and np.isclose(view.volatility(), full.volatility()))
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped price history shared read-only between processes.
+
+A price file holds one universe of tickers in a fixed layout:
+
+    magic (8 bytes) | header length (uint64) | JSON header
+    dates   int64[days]                 (datetime64[ns], 64-byte aligned)
+    values  float64[fields, days, tickers]          (64-byte aligned)
+
+Every Dash worker, batch job or backtest maps the same file, so slicing a
+date range is a view into the page cache rather than a parsed copy. Files are
+replaced with an atomic rename; open readers keep the old data until they call
+refresh().
+
+Replacing a file under live readers is POSIX-only: Windows refuses to rename
+onto a file another process has mapped, so there write_price_file raises
+PermissionError until the readers are stopped (or write to a new path).
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'SSPRICE1'
+ALIGNMENT = 64
+
+_HEADER_PREFIX = struct.Struct('<8sQ')
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _layout(header_bytes, n_days):
+    """Byte offsets of the dates and values blocks."""
+    dates_offset = _align(_HEADER_PREFIX.size + len(header_bytes))
+    values_offset = _align(dates_offset + 8 * n_days)
+    return dates_offset, values_offset
+
+# ======== Writing ========
+
+def frames_from_long(data, ticker_column='Stock', date_column='Date'):
+    """
+    Split a long-format table (one row per ticker and date) into per-ticker frames.
+
+    :param data: DataFrame - e.g. the nautical dashboard CSV with Stock and Date columns
+    :param ticker_column: str - Column holding the ticker symbol
+    :param date_column: str - Column holding the date
+    :return: dict - Ticker mapped to a DataFrame indexed by date
+    """
+    data = data.assign(**{date_column: pd.to_datetime(data[date_column])})
+    return {ticker: group.drop(columns=ticker_column).set_index(date_column)
+            for ticker, group in data.groupby(ticker_column, sort=False)}
+
+def write_price_file(path, frames, fields=None):
+    """
+    Write per-ticker price frames to a price file, replacing it atomically (POSIX).
+
+    On Windows the replace fails while any process has the old file mapped.
+
+    :param path: str - Destination file
+    :param frames: dict - Ticker mapped to a DataFrame indexed by date (e.g. fetch_stock_data output)
+    :param fields: list - Columns to store (default: numeric columns shared by all frames)
+    :return: str - The path written
+    """
+    if fields is None:
+        shared = [set(frame.select_dtypes('number').columns) for frame in frames.values()]
+        first = next(iter(frames.values()))
+        fields = [c for c in first.columns if all(c in columns for columns in shared)]
+    tickers = list(frames)
+
+    indexes = []
+    for frame in frames.values():
+        index = pd.DatetimeIndex(frame.index)
+        indexes.append(index.tz_localize(None) if index.tz is not None else index)
+    dates = indexes[0].append(indexes[1:]).unique().sort_values() if indexes else pd.DatetimeIndex([])
+
+    values = np.full((len(fields), len(dates), len(tickers)), np.nan)
+    for j, (frame, index) in enumerate(zip(frames.values(), indexes)):
+        rows = dates.get_indexer(index)
+        values[:, rows, j] = frame[fields].to_numpy(dtype=np.float64).T
+
+    header = json.dumps({'tickers': tickers, 'fields': list(fields), 'days': len(dates)}).encode('utf-8')
+    dates_offset, values_offset = _layout(header, len(dates))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates the file private; readers may run as other users (no fchmod on Windows)
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), 0o644)
+            f.write(_HEADER_PREFIX.pack(MAGIC, len(header)))
+            f.write(header)
+            f.seek(dates_offset)
+            f.write(dates.values.astype('datetime64[ns]').astype('<i8').tobytes())
+            f.seek(values_offset)
+            values.astype('<f8').tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+# ======== Reading ========
+
+class _Mapping:
+    """
+    One consistent mapping of a price file: header, lookups and arrays together.
+    """
+
+    def __init__(self, path, stat):
+        with open(path, 'rb') as f:
+            magic, header_length = _HEADER_PREFIX.unpack(f.read(_HEADER_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a price file")
+            header = f.read(header_length)
+        info = json.loads(header)
+        dates_offset, values_offset = _layout(header, info['days'])
+
+        self.stat = stat
+        self.tickers = info['tickers']
+        self.fields = info['fields']
+        self.ticker_columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.field_planes = {field: i for i, field in enumerate(self.fields)}
+        shape = (len(self.fields), info['days'], len(self.tickers))
+        if info['days'] and self.tickers and self.fields:
+            dates = np.memmap(path, dtype='<i8', mode='r', offset=dates_offset, shape=(info['days'],))
+            self.values = np.memmap(path, dtype='<f8', mode='r', offset=values_offset, shape=shape)
+        else:
+            dates = np.zeros(info['days'], dtype='<i8')
+            self.values = np.zeros(shape)
+        self.dates = dates.view('datetime64[ns]')
+
+    def rows(self, start, end):
+        first = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), 'left'))
+        last = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), 'right'))
+        return slice(first, last)
+
+class PriceArray:
+    """
+    Read-only memory map of a price file.
+
+    Arrays returned by matrix() and dates are views into the mapping; they
+    are shared with every other process mapping the same file. refresh()
+    publishes a new mapping with a single assignment, so a method running
+    in another thread sees either the old or the new file, never a mix.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mapping = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Remap the file if it was replaced since it was last mapped.
+
+        :return: bool - True if the mapping changed
+        """
+        stat = os.stat(self.path)
+        current = self._mapping
+        if current is not None and (stat.st_ino, stat.st_mtime_ns) == (current.stat.st_ino, current.stat.st_mtime_ns):
+            return False
+        self._mapping = _Mapping(self.path, stat)
+        return True
+
+    @property
+    def tickers(self):
+        return self._mapping.tickers
+
+    @property
+    def fields(self):
+        return self._mapping.fields
+
+    @property
+    def values(self):
+        return self._mapping.values
+
+    @property
+    def dates(self):
+        return self._mapping.dates
+
+    def rows(self, start=None, end=None):
+        """
+        Row range covering a date range, found by binary search on the date index.
+
+        :param start: str or Timestamp - First date (inclusive, default: first row)
+        :param end: str or Timestamp - Last date (inclusive, default: last row)
+        :return: slice - Rows of the date range
+        """
+        return self._mapping.rows(start, end)
+
+    def matrix(self, field='Close', start=None, end=None):
+        """
+        Zero-copy (days x tickers) view of one field over a date range.
+
+        :param field: str - Stored field, e.g. 'Close'
+        :return: ndarray - Read-only view; columns follow self.tickers
+        """
+        mapping = self._mapping
+        return mapping.values[mapping.field_planes[field], mapping.rows(start, end)]
+
+    def frame(self, ticker, start=None, end=None, fields=None):
+        """
+        One ticker's history as a DataFrame indexed by date.
+
+        :param ticker: str - Stock ticker symbol
+        :param fields: list - Fields to include (default: all)
+        :return: DataFrame - Empty if the ticker is not in the file
+        """
+        mapping = self._mapping
+        fields = mapping.fields if fields is None else fields
+        if ticker not in mapping.ticker_columns:
+            return pd.DataFrame(columns=fields)
+        rows = mapping.rows(start, end)
+        column = mapping.ticker_columns[ticker]
+        data = {field: mapping.values[mapping.field_planes[field], rows, column] for field in fields}
+        return pd.DataFrame(data, index=pd.DatetimeIndex(mapping.dates[rows], name='Date')).dropna(how='all')
+
+if __name__ == "__main__":
+    # Example usage: convert a long-format CSV (Stock, Date, Close, ...) to a price file
+    if len(sys.argv) != 3:
+        sys.exit("usage: python price_mmap.py <prices.csv> <prices.bin>")
+    write_price_file(sys.argv[2], frames_from_long(pd.read_csv(sys.argv[1])))
+    prices = PriceArray(sys.argv[2])
+    print(f"{len(prices.tickers)} tickers x {len(prices.dates)} days x {len(prices.fields)} fields -> {sys.argv[2]}")
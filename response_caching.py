@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Response compression and data versioning for the dashboard servers.
+
+enable_compression gzip- or brotli-encodes the Flask responses behind a Dash
+app (brotli only if the optional brotli package is installed). data_version
+gives a short tag for the data behind a set of figures so a client holding
+figures with the same tag does not need them resent.
+"""
+
+import gzip
+import hashlib
+
+import pandas as pd
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 500
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'text/plain',
+}
+
+# ======== Compression ========
+
+def _accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header.
+
+    :param header: str - Header value, e.g. 'gzip, deflate, br;q=0.8'
+    :return: set - Encodings the client accepts (q=0 entries excluded)
+    """
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(header):
+    """
+    Pick the best encoding this server can produce for an Accept-Encoding header.
+
+    :param header: str - Accept-Encoding header value
+    :return: str or None - 'br', 'gzip', or None for no compression
+    """
+    accepted = _accepted_encodings(header)
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def compress_body(body, encoding, level=6):
+    """
+    :param body: bytes - Response body
+    :param encoding: str - 'br' or 'gzip'
+    :param level: int - gzip compression level (brotli uses a matching quality)
+    :return: bytes - Compressed body
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=min(level - 1, 11))
+    return gzip.compress(body, compresslevel=level)
+
+def enable_compression(server, min_size=COMPRESS_MIN_SIZE, level=6):
+    """
+    Compress compressible responses of a Flask server, e.g. dash_app.server.
+
+    :param server: Flask - Server to register the response hook on
+    :param min_size: int - Smallest body size in bytes to compress
+    :param level: int - Compression level (1 fastest, 9 smallest)
+    :return: Flask - The same server
+    """
+    @server.after_request
+    def compress_response(response):
+        if (response.direct_passthrough
+                or not 200 <= response.status_code < 300
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        body = response.get_data()
+        if encoding is None or len(body) < min_size:
+            return response
+        response.set_data(compress_body(body, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return server
+
+# ======== Data Versions ========
+
+def data_version(*frames):
+    """
+    Tag identifying the contents of the DataFrames figures are built from.
+
+    Works like an HTTP ETag: the tag only changes when the data does.
+
+    :param frames: DataFrame - Data behind the figures (index included)
+    :return: str - 16-character hex tag
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for frame in frames:
+        digest.update(str(list(frame.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Sentiment data for the Stock Savvy dashboard.
+
+Sample sentiment is generated deterministically per ticker so that every tab
+shows the same numbers, and frames are cached in a store so each ticker is
+only generated once. The store takes any provider with the same signature as
+generate_sentiment_data, so a file-backed source can replace the generator.
+"""
+
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+SENTIMENT_START = '2023-01-01'
+SENTIMENT_PERIODS = 30
+
+SENTIMENT_COLUMNS = ['Date', 'Positive', 'Neutral', 'Negative', 'Volume', 'Volatility', 'Sentiment Index']
+
+# Independent random streams, one per generated column
+_STREAMS = {'Positive': 1, 'Neutral': 2, 'Negative': 3, 'Volume': 4, 'Volatility': 5}
+
+_EPOCH_DAY = np.datetime64('1970-01-01', 'D')
+
+# ======== Deterministic Generator ========
+
+def _splitmix64(x):
+    """
+    Vectorized SplitMix64 hash; uint64 arithmetic wraps, which is intended.
+
+    :param x: ndarray - uint64 values
+    :return: ndarray - Well-mixed uint64 values
+    """
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def ticker_seed(ticker):
+    """
+    Stable seed for a ticker (unlike hash(), it does not change between runs).
+
+    :param ticker: str - Stock ticker symbol
+    :return: int - 32-bit seed
+    """
+    return zlib.crc32(ticker.upper().encode('utf-8'))
+
+def _uniform(seeds, days, stream):
+    """
+    Uniform [0, 1) values for every (ticker, day) pair of one stream.
+
+    Each value depends only on the ticker, the calendar day and the stream, so
+    a ticker's history is the same whatever range or batch it was drawn in.
+
+    :param seeds: ndarray - uint64 seed per ticker, shape (n_tickers,)
+    :param days: ndarray - uint64 days since epoch, shape (n_days,)
+    :param stream: int - Stream number of the column being generated
+    :return: ndarray - float64 values, shape (n_tickers, n_days)
+    """
+    keys = _splitmix64(seeds ^ (np.uint64(stream) << np.uint64(32)))
+    bits = _splitmix64(keys[:, None] + days[None, :])
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+def _randint(seeds, days, stream, low, high):
+    return low + (_uniform(seeds, days, stream) * (high - low)).astype(np.int64)
+
+def generate_sentiment_data(tickers, start=SENTIMENT_START, periods=SENTIMENT_PERIODS):
+    """
+    Generate sample sentiment data for many tickers in one vectorized pass.
+
+    :param tickers: list - Stock ticker symbols
+    :param start: str - First date of the range
+    :param periods: int - Number of daily rows per ticker
+    :return: dict - Ticker mapped to a DataFrame with SENTIMENT_COLUMNS
+    """
+    dates = pd.date_range(start=start, periods=periods, freq='D')
+    days = (dates.values.astype('datetime64[D]') - _EPOCH_DAY).astype(np.uint64)
+    seeds = np.array([ticker_seed(t) for t in tickers], dtype=np.uint64)
+
+    positive = _randint(seeds, days, _STREAMS['Positive'], 10, 40)
+    neutral = _randint(seeds, days, _STREAMS['Neutral'], 20, 50)
+    negative = _randint(seeds, days, _STREAMS['Negative'], 5, 30)
+    volume = _randint(seeds, days, _STREAMS['Volume'], 100000, 1000000)
+    volatility = 1 + 2 * _uniform(seeds, days, _STREAMS['Volatility'])
+    # Calculate sentiment index as a simple weighted score
+    sentiment_index = positive - negative
+
+    frames = {}
+    for i, ticker in enumerate(tickers):
+        frames[ticker] = pd.DataFrame({
+            'Date': dates,
+            'Positive': positive[i],
+            'Neutral': neutral[i],
+            'Negative': negative[i],
+            'Volume': volume[i],
+            'Volatility': volatility[i],
+            'Sentiment Index': sentiment_index[i]
+        })
+    return frames
+
+# ======== Cached Store ========
+
+class SentimentStore:
+    """
+    Cache of sentiment frames keyed by ticker and date range.
+
+    Frames are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, provider=generate_sentiment_data, start=SENTIMENT_START, periods=SENTIMENT_PERIODS):
+        """
+        :param provider: callable - provider(tickers, start, periods) returning a dict of DataFrames
+        :param start: str - Default first date of the range
+        :param periods: int - Default number of daily rows
+        """
+        self.provider = provider
+        self.start = start
+        self.periods = periods
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, tickers, start=None, periods=None):
+        """
+        Load every ticker not cached yet with a single provider call.
+
+        :param tickers: list - Stock ticker symbols
+        :param start: str - First date of the range (default: store default)
+        :param periods: int - Number of daily rows (default: store default)
+        """
+        start = self.start if start is None else start
+        periods = self.periods if periods is None else periods
+        with self._lock:
+            missing = [t for t in dict.fromkeys(tickers) if (t, start, periods) not in self._frames]
+            if missing:
+                for ticker, frame in self.provider(missing, start, periods).items():
+                    self._frames[(ticker, start, periods)] = frame
+
+    def get(self, ticker, start=None, periods=None):
+        """
+        Sentiment data for one ticker, generated on first use.
+
+        :param ticker: str - Stock ticker symbol
+        :return: DataFrame - Sentiment data (empty with SENTIMENT_COLUMNS if ticker is None)
+        """
+        if ticker is None:
+            return pd.DataFrame(columns=SENTIMENT_COLUMNS)
+        start = self.start if start is None else start
+        periods = self.periods if periods is None else periods
+        key = (ticker, start, periods)
+        frame = self._frames.get(key)
+        if frame is None:
+            self.prefetch([ticker], start, periods)
+            frame = self._frames[key]
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+# Shared store used by the dashboard callbacks
+sentiment_store = SentimentStore()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Session-aware server-side cache with a global memory budget.
+
+Every browser session asks for data and figures through a ResourceManager.
+Identical entries (same key) are stored once and shared between sessions by
+reference count. When the total size passes the budget, entries no session
+holds are evicted first, least recently used first, then the least recently
+used held ones, which are simply rebuilt on the next request. Sessions that
+stay idle longer than the timeout release everything they hold. State a
+session changes in place belongs in SessionStates instead.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ======== Size Estimates ========
+
+def estimate_size(value):
+    """
+    Approximate memory held by a cached value.
+
+    :param value: object - DataFrame, array, plotly figure or plain container
+    :return: int - Size in bytes
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, 'to_plotly_json'):
+        return estimate_size(value.to_plotly_json())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+# ======== Resource Manager ========
+
+class ResourceManager:
+    """
+    Reference-counted cache of per-session data under one memory budget.
+    """
+
+    def __init__(self, budget_bytes, session_timeout=30 * 60):
+        """
+        :param budget_bytes: int - Total size of cached entries to stay under
+        :param session_timeout: float - Seconds after which an idle session is released
+        """
+        self.budget_bytes = budget_bytes
+        self.session_timeout = session_timeout
+        self._entries = OrderedDict()  # key -> entry dict, least recently used first
+        self._sessions = {}            # session id -> {'keys': set, 'last_seen': float}
+        self._pending = {}             # key -> lock held while the entry is being built
+        self._used = 0
+        self._last_sweep = 0.0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def get(self, session_id, key, factory, max_age=None, size_of=estimate_size):
+        """
+        Cached value for a key, built with factory() on a miss, held by the session.
+
+        Concurrent misses on the same key build it once. Cached values are
+        shared between sessions and must not be modified.
+
+        :param session_id: str - Browser session asking for the value
+        :param key: tuple - Identifies the value, e.g. ('stock', 'IBM', '1y', '1d')
+        :param factory: callable - Builds the value when it is not cached
+        :param max_age: float - Seconds before a cached value is rebuilt (default: never)
+        :param size_of: callable - Estimates the value's size in bytes
+        :return: object - The cached or newly built value
+        """
+        now = time.time()
+        with self._lock:
+            self._touch_session(session_id, now)
+            entry = self._fresh_entry(key, now, max_age)
+            if entry is not None:
+                self._stats['hits'] += 1
+                return self._attach(session_id, key, entry)
+            pending = self._pending.setdefault(key, threading.Lock())
+
+        with pending:
+            with self._lock:
+                entry = self._fresh_entry(key, now, max_age)
+                if entry is not None:
+                    self._stats['hits'] += 1
+                    return self._attach(session_id, key, entry)
+                self._stats['misses'] += 1
+            try:
+                value = factory()
+                size = size_of(value)
+            except BaseException:
+                with self._lock:
+                    self._pending.pop(key, None)
+                raise
+            with self._lock:
+                self._discard(key)
+                entry = {'value': value, 'size': size, 'created': time.time(), 'sessions': set()}
+                self._entries[key] = entry
+                self._used += size
+                self._attach(session_id, key, entry)
+                self._pending.pop(key, None)
+                self._evict()
+        return value
+
+    def release_session(self, session_id):
+        """
+        Drop a session's references; entries only it held become evictable.
+
+        :param session_id: str - Session to release
+        """
+        with self._lock:
+            self._release(session_id)
+
+    def usage(self):
+        """
+        Current memory use, for monitoring.
+
+        :return: dict - Budget, bytes used, entry and session counts and hit statistics
+        """
+        with self._lock:
+            self._expire_sessions(time.time())
+            return {
+                'budget_bytes': self.budget_bytes,
+                'used_bytes': self._used,
+                'entries': len(self._entries),
+                'shared_entries': sum(1 for entry in self._entries.values() if len(entry['sessions']) > 1),
+                'sessions': len(self._sessions),
+                **self._stats,
+            }
+
+    # Everything below is called with self._lock held
+
+    def _fresh_entry(self, key, now, max_age):
+        entry = self._entries.get(key)
+        if entry is None or (max_age is not None and now - entry['created'] > max_age):
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _attach(self, session_id, key, entry):
+        entry['sessions'].add(session_id)
+        self._sessions[session_id]['keys'].add(key)
+        return entry['value']
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._used -= entry['size']
+        for session_id in entry['sessions']:
+            self._sessions[session_id]['keys'].discard(key)
+
+    def _evict(self):
+        if self._used <= self.budget_bytes:
+            return
+        unheld = [key for key, entry in self._entries.items() if not entry['sessions']]
+        held = [key for key, entry in self._entries.items() if entry['sessions']]
+        for key in unheld + held:
+            if self._used <= self.budget_bytes:
+                break
+            self._discard(key)
+            self._stats['evictions'] += 1
+
+    def _touch_session(self, session_id, now):
+        self._sessions.setdefault(session_id, {'keys': set()})['last_seen'] = now
+        if now - self._last_sweep > min(self.session_timeout, 60):
+            self._expire_sessions(now)
+
+    def _expire_sessions(self, now):
+        self._last_sweep = now
+        idle = [s for s, session in self._sessions.items() if now - session['last_seen'] > self.session_timeout]
+        for session_id in idle:
+            self._release(session_id)
+
+    def _release(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        for key in session['keys']:
+            self._entries[key]['sessions'].discard(session_id)
+
+# ======== Per-Session State ========
+
+class SessionStates:
+    """
+    Mutable state private to each session, kept apart from the shared cache.
+
+    Every session gets a dict with a 'lock' to hold while reading or changing
+    the rest of it, so concurrent requests from one session apply in turn.
+    States of sessions idle longer than the timeout are dropped, and beyond
+    max_sessions the least recently used ones go first.
+    """
+
+    def __init__(self, max_sessions=100, session_timeout=30 * 60):
+        """
+        :param max_sessions: int - Most sessions whose state is kept
+        :param session_timeout: float - Seconds after which an idle session's state is dropped
+        """
+        self.max_sessions = max_sessions
+        self.session_timeout = session_timeout
+        self._states = OrderedDict()  # session id -> state dict, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """
+        :param session_id: str - Browser session
+        :return: dict - The session's state, new and empty apart from its 'lock' on first use
+        """
+        now = time.time()
+        with self._lock:
+            state = self._states.pop(session_id, None)
+            if state is None:
+                state = {'lock': threading.Lock()}
+            state['last_seen'] = now
+            self._states[session_id] = state
+            while self._states:
+                oldest_id, oldest = next(iter(self._states.items()))
+                if len(self._states) <= self.max_sessions and now - oldest['last_seen'] <= self.session_timeout:
+                    break
+                del self._states[oldest_id]
+            return state
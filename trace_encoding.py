@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Compact line traces for long price series.
+
+Series above WEBGL_POINT_THRESHOLD points are drawn with Scattergl instead of
+SVG Scatter, and trace data is sent as base64 typed arrays (float64 epoch-ms
+dates and values) instead of ISO date strings. Prices and portfolio values
+need float64; bounded indicators such as RSI or volatility can use float32
+to halve their size. Figures built from these traces need a date x-axis, see
+DATE_AXIS.
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import plotly.io as pio
+
+# Above this many points a trace is rendered with WebGL
+WEBGL_POINT_THRESHOLD = 5000
+
+# Epoch-ms x values are plain numbers, so the axis type has to be forced
+DATE_AXIS = {'title': 'Date', 'type': 'date'}
+
+# ======== Typed Array Encoding ========
+
+def encode_values(values, dtype='f8'):
+    """
+    Encode numeric values as a plotly.js typed array.
+
+    :param values: array-like - Numeric values; NaN is kept and drawn as a gap
+    :param dtype: str - Typed array type ('f8' for float64, 'f4' for float32 where ~7 digits suffice)
+    :return: dict - {'dtype': ..., 'bdata': base64 string}
+    """
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+def encode_dates(index):
+    """
+    Encode dates as float64 milliseconds since the epoch.
+
+    Timezone-aware dates keep their local wall-clock time, which is what the
+    ISO strings showed before.
+
+    :param index: DatetimeIndex or Series - Dates to encode
+    :return: dict - Typed array with dtype 'f8'
+    """
+    dates = pd.DatetimeIndex(index)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    epoch_ms = dates.values.astype('datetime64[ms]').astype(np.int64).astype(np.float64)
+    return encode_values(epoch_ms, dtype='f8')
+
+# ======== Trace Construction ========
+
+def line_trace(x, y, dtype='f8', **kwargs):
+    """
+    Line trace over dates, using WebGL for long series.
+
+    :param x: DatetimeIndex or Series - Dates
+    :param y: Series or array-like - Values to plot
+    :param dtype: str - Typed array type of the values, see encode_values
+    :param kwargs: Any other Scatter attributes (mode, name, line, yaxis, ...)
+    :return: go.Scatter or go.Scattergl
+    """
+    trace_type = go.Scattergl if len(y) > WEBGL_POINT_THRESHOLD else go.Scatter
+    return trace_type(x=encode_dates(x), y=encode_values(y, dtype), **kwargs)
+
+def payload_bytes(fig):
+    """
+    Size of the JSON a figure is sent to the browser as.
+
+    :param fig: go.Figure - Figure to measure
+    :return: int - Number of bytes
+    """
+    return len(pio.to_json(fig, validate=False).encode('utf-8'))
+
+if __name__ == "__main__":
+    # Compare payload sizes of the original go.Scatter(x=index, y=series) traces with line_trace
+    for label, periods, freq in [('1y daily', 252, 'B'), ('5y hourly', 5 * 252 * 7, 'h'), ('60d 1-minute', 60 * 390, 'min')]:
+        dates = pd.date_range('2024-01-02 09:30', periods=periods, freq=freq, tz='America/New_York')
+        close = pd.Series(100 + np.random.default_rng(0).standard_normal(periods).cumsum(), index=dates)
+        before = go.Figure(go.Scatter(x=dates, y=close, mode='lines'))
+        after = go.Figure(line_trace(dates, close, mode='lines'), layout={'xaxis': DATE_AXIS})
+        after_f4 = go.Figure(line_trace(dates, close, dtype='f4', mode='lines'), layout={'xaxis': DATE_AXIS})
+        print(f"{label:>14}: {periods:6d} points, {type(after.data[0]).__name__:<9} "
+              f"{payload_bytes(before):9d} -> {payload_bytes(after):8d} bytes (f8), {payload_bytes(after_f4):8d} (f4)")